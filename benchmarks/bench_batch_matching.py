@@ -0,0 +1,87 @@
+# Local (non-LLM) cost of matching many resumes against one job set, with
+# and without the shared JobFeatures precomputation used by
+# `python -m statejobs batch`.
+#
+#   python benchmarks/bench_batch_matching.py [--jobs 5000] [--resumes 20]
+#
+# A min_score above 1.0 prunes every job before the LLM, so only the local
+# work (prechecks, salary parsing, pre-ranking) is timed. Both runs must
+# produce the same results or the benchmark fails.
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from statejobs.matching import JobFeatures, run_matching_async  # noqa: E402
+
+WORDS = (
+    "nurse patient clinical data engineer python pipeline accounting budget audit teacher curriculum "
+    "software analyst program policy grant fiscal contract inspector safety maintenance vehicle court "
+    "clerk records laboratory research environmental permit highway engineering license investigator"
+).split()
+
+
+def synthetic_jobs(count, rng):
+    return [
+        {
+            "item_number": str(100000 + i),
+            "job_title": " ".join(rng.choices(WORDS, k=3)).title(),
+            "salary_range": f"${40000 + i % 60 * 1000:,} to ${55000 + i % 60 * 1000:,} Annually",
+            "duties_description": " ".join(rng.choices(WORDS, k=120)),
+            "minimum_qualifications": " ".join(rng.choices(WORDS, k=60)),
+            "agency": f"Agency {i % 40}"
+        }
+        for i in range(count)
+    ]
+
+
+def synthetic_resumes(count, rng):
+    return [
+        (" ".join(rng.choices(WORDS, k=400)), rng.choice(WORDS).title(), f"${50000 + i * 1000:,}-${70000 + i * 1000:,}")
+        for i in range(count)
+    ]
+
+
+async def match_all(jobs, resumes, features):
+    options = {"min_score": 1.01, "salary_mode": "deprioritize", "features": features}
+    return [await run_matching_async(jobs, *resume, **options) for resume in resumes]
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark batch matching precomputation.")
+    parser.add_argument("--jobs", type=int, default=5000)
+    parser.add_argument("--resumes", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    jobs = synthetic_jobs(args.jobs, rng)
+    resumes = synthetic_resumes(args.resumes, rng)
+
+    naive_time, naive = timed(lambda: asyncio.run(match_all(jobs, resumes, None)))
+    build_time, features = timed(lambda: JobFeatures(jobs))
+    shared_time, shared = timed(lambda: asyncio.run(match_all(jobs, resumes, features)))
+
+    print(f"{args.jobs:,} jobs x {args.resumes} resumes")
+    print(f"{'approach':<34} {'seconds':>8}")
+    print(f"{'per-resume job-side work':<34} {naive_time:>8.2f}")
+    print(f"{'shared JobFeatures (build)':<34} {build_time:>8.2f}")
+    print(f"{'shared JobFeatures (matching)':<34} {shared_time:>8.2f}")
+
+    failed = [results for results, _ in naive] != [results for results, _ in shared]
+    if failed:
+        print("results differ")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+# Filtering benchmark for the columnar JobTable against the list-of-dicts
+# scan and the SQLite store query it replaces on the main page.
+#
+#   python benchmarks/bench_jobtable.py [--rows 50000] [--repeat 20]
+#
+# Every approach must select the same rows or the run fails.
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from statejobs.jobtable import JobTable  # noqa: E402
+from statejobs.store import JobStore  # noqa: E402
+
+COUNTIES = [f"County {i}" for i in range(62)]
+
+
+def synthetic_jobs(rows):
+    return [
+        {
+            "item_number": str(100000 + i),
+            "job_title": f"Program Analyst {i % 400}",
+            "salary_grade": str(10 + i % 20),
+            "posting_date": f"01/{1 + i % 28:02d}/25",
+            "application_deadline": f"02/{1 + i % 28:02d}/25",
+            "agency": f"Department of Agency {i % 150}",
+            "county": COUNTIES[i % len(COUNTIES)]
+        }
+        for i in range(rows)
+    ]
+
+
+def bench(func, repeat):
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark vacancy filtering.")
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    jobs = synthetic_jobs(args.rows)
+    counties = COUNTIES[:3]
+    agencies = [f"Department of Agency {i}" for i in range(0, 150, 2)]
+    grades = ["12", "14", "18"]
+
+    def scan():
+        # What the page did before: rebuild the option list and rescan every row.
+        sorted(set(job['county'] for job in jobs))
+        return [
+            job for job in jobs
+            if job['county'] in counties and job['agency'] in agencies and job['salary_grade'] in grades
+        ]
+
+    build_time, table = bench(lambda: JobTable(jobs), 3)
+
+    def cold():
+        table._cache.clear()
+        return table.records(table.filter(county=counties, agency=agencies, salary_grade=grades))
+
+    def warm():
+        return table.filter(county=counties, agency=agencies, salary_grade=grades)
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = JobStore(os.path.join(directory, "bench.sqlite3"))
+        store.replace_vacancies(jobs)
+        sqlite_time, sqlite_rows = bench(lambda: store.load_vacancies(counties=counties, agencies=agencies), args.repeat)
+        store.close()
+    sqlite_rows = [job for job in sqlite_rows if job['salary_grade'] in grades]
+
+    scan_time, expected = bench(scan, args.repeat)
+    cold_time, cold_rows = bench(cold, args.repeat)
+    warm_time, warm_rows = bench(warm, args.repeat * 50)
+
+    print(f"{args.rows:,} rows, {len(expected):,} selected; JobTable built in {build_time * 1000:.1f} ms")
+    print(f"{'approach':<28} {'ms/filter':>10}")
+    print(f"{'list scan':<28} {scan_time * 1000:>10.3f}")
+    print(f"{'sqlite store (county+agency)':<28} {sqlite_time * 1000:>10.3f}")
+    print(f"{'JobTable, uncached + records':<28} {cold_time * 1000:>10.3f}")
+    print(f"{'JobTable, cached':<28} {warm_time * 1000:>10.3f}")
+
+    failed = cold_rows != expected or sqlite_rows != expected or table.records(warm_rows) != expected
+    if failed:
+        print("filter results differ")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+# Parse benchmark for the vacancy-table and detail-page parsers.
+#
+#   python benchmarks/bench_parse.py [--table vacancyTable.html] [--detail vacancyDetails.html]
+#
+# Point --table / --detail at pages saved from statejobs.ny.gov. Without them a
+# synthetic page with the same structure is generated. Every backend must
+# produce the same job dicts as html.parser or the run fails.
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from statejobs.parse import available_backends, parse_job_details, parse_vacancy_table  # noqa: E402
+
+
+def synthetic_table(rows=5000):
+    counties = ["Albany", "Erie", "Kings", "Monroe", "New York", "Onondaga", "Westchester"]
+    body = []
+    for i in range(rows):
+        body.append(
+            "<tr>"
+            f"<td><a href='vacancyDetailsView.cfm?id={100000 + i}'>{100000 + i}</a></td>"
+            f"<td>Program Analyst &amp; Trainee {i % 40}</td>"
+            f"<td> {10 + i % 20} </td>"
+            "<td>01/02/25</td><td>02/15/25</td>"
+            f"<td>Department of Agency {i % 60}</td>"
+            f"<td>{counties[i % len(counties)]}</td>"
+            "</tr>"
+        )
+    return (
+        "<html><head><title>Vacancies</title></head><body><div id='nav'>"
+        + "<p>navigation</p>" * 200
+        + "</div><table id='vacancyTable'><thead><tr><th>Item</th></tr></thead><tbody>"
+        + "".join(body)
+        + "</tbody></table></body></html>"
+    )
+
+
+def synthetic_detail():
+    def row(key, val):
+        return f"<p class='row'><span class='leftCol'>{key}</span><span class='rightCol'>{val}</span></p>"
+
+    return (
+        "<html><body><h2>Review Vacancy</h2>"
+        "<p>Date Posted: 01/02/25 Applications Due: 02/15/25 Vacancy ID: 170001</p>"
+        "<div id='vacancyDetails'>"
+        "<h3>Basic Vacancy Information</h3>"
+        + row("Title", "Program Analyst")
+        + row("Salary Range", "$42,939 to $52,989 Annually")
+        + "<h3>Location</h3>"
+        + row("Street Address", "1 Main St")
+        + row("City", "Albany")
+        + row("State", "NY")
+        + row("Zip Code", "12207")
+        + "<h3>Job Specifics</h3>"
+        + row("Duties Description", "Analyze programs. " * 80)
+        + row("Minimum Qualifications", "Bachelor's degree and two years of experience. " * 20)
+        + "<h3>Contact Information</h3>"
+        + row("Name", "Jane Doe")
+        + row("Telephone", "518-555-0100")
+        + row("Email Address", "jobs@example.ny.gov")
+        + "<h5 class='heading'>Address</h5>"
+        + row("Street", "2 State St")
+        + row("City", "Troy")
+        + row("State", "NY")
+        + row("Zip Code", "12180")
+        + row("Notes on Applying", "Email a resume and cover letter.")
+        + "</div></body></html>"
+    )
+
+
+def bench(fn, repeat):
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the vacancy-table and detail-page parsers.")
+    parser.add_argument("--table", help="saved vacancyTable.cfm page")
+    parser.add_argument("--detail", help="saved vacancyDetailsPrint.cfm page")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.table:
+        with open(args.table, "r", encoding="utf-8", errors="ignore") as f:
+            table_html = f.read()
+    else:
+        table_html = synthetic_table()
+    if args.detail:
+        with open(args.detail, "r", encoding="utf-8", errors="ignore") as f:
+            detail_html = f.read()
+    else:
+        detail_html = synthetic_detail()
+
+    reference_jobs = parse_vacancy_table(table_html, backend="html.parser")
+    reference_detail = parse_job_details(detail_html, "170001", backend="html.parser")
+
+    print(f"{'backend':<12} {'table rows/s':>14} {'detail pages/s':>16}")
+    failed = False
+    for backend in available_backends():
+        table_time, jobs = bench(lambda: parse_vacancy_table(table_html, backend=backend), args.repeat)
+        detail_time, detail = bench(lambda: parse_job_details(detail_html, "170001", backend=backend), args.repeat * 20)
+        if jobs != reference_jobs or detail != reference_detail:
+            print(f"{backend}: output differs from html.parser")
+            failed = True
+        print(f"{backend:<12} {len(jobs) / table_time:>14,.0f} {1 / detail_time:>16,.1f}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
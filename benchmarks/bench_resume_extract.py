@@ -0,0 +1,114 @@
+# Timing check for resume extraction on a 10-page PDF.
+#
+#   python benchmarks/bench_resume_extract.py [--pdf resume.pdf] [--repeat 5]
+#
+# Without --pdf a 10-page text PDF is generated. Compares the old per-rerun
+# PyPDF2 loop (string +=), each installed extractor, and a rerun that hits
+# the digest-keyed cache the matching page uses.
+import argparse
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import PyPDF2  # noqa: E402
+
+from statejobs.resume import extract_pdf_text, fitz, pypdfium2, resume_digest  # noqa: E402
+
+
+def fixture_pdf(pages=10, lines_per_page=45):
+    # Hand-rolled PDF with one Helvetica text stream per page.
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # page tree, filled in once the page ids are known
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    page_ids = []
+    for page in range(pages):
+        lines = [
+            f"({'Page %d line %d: built ETL pipelines in Python and SQL for state agency reporting.' % (page + 1, line + 1)}) Tj T*"
+            for line in range(lines_per_page)
+        ]
+        stream = ("BT /F1 10 Tf 12 TL 50 760 Td " + " ".join(lines) + " ET").encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        content_id = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id
+        )
+        page_ids.append(len(objects))
+    kids = b" ".join(b"%d 0 R" % i for i in page_ids)
+    objects[1] = b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % pages
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for offset in offsets:
+        out.write(b"%010d 00000 n \n" % offset)
+    out.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+    return out.getvalue()
+
+
+def old_extraction(data):
+    resume_text = ""
+    pdf_reader = PyPDF2.PdfReader(io.BytesIO(data))
+    for page in pdf_reader.pages:
+        resume_text += page.extract_text() + "\n"
+    return resume_text
+
+
+def timed(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time resume extraction on a 10-page PDF.")
+    parser.add_argument("--pdf", help="PDF to extract instead of the generated fixture")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.pdf:
+        with open(args.pdf, "rb") as f:
+            data = f.read()
+    else:
+        data = fixture_pdf()
+
+    reference = old_extraction(data)
+    print(f"{len(PyPDF2.PdfReader(io.BytesIO(data)).pages)} pages, {len(reference):,} characters")
+    print(f"{'path':<28} {'ms per rerun':>12}")
+    print(f"{'PyPDF2 += (old)':<28} {timed(lambda: old_extraction(data), args.repeat) * 1000:>12.1f}")
+
+    backends = ["PyPDF2"]
+    if fitz is not None:
+        backends.append("pymupdf")
+    if pypdfium2 is not None:
+        backends.append("pypdfium2")
+    for backend in backends:
+        elapsed = timed(lambda: extract_pdf_text(data, backend), args.repeat)
+        print(f"{backend + ' join':<28} {elapsed * 1000:>12.1f}")
+
+    cache = {resume_digest(data): extract_pdf_text(data)}
+    elapsed = timed(lambda: cache[resume_digest(data)], args.repeat)
+    print(f"{'cached rerun (sha256 hit)':<28} {elapsed * 1000:>12.3f}")
+
+    if extract_pdf_text(data, "PyPDF2") != reference:
+        print("PyPDF2 join output differs from the old loop")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,139 @@
+# End-to-end scrape latency and peak memory of the buffered vacancy-table
+# scrape (download, parse, then fetch details) against the streaming one
+# (details fetched while the table is still downloading), served by a local
+# HTTP server that throttles the table body and delays every detail page.
+#
+#   python benchmarks/bench_stream_table.py [--rows 20000] [--selected-every 50]
+#
+# Both runs must store the same vacancies and details or the run fails.
+import argparse
+import datetime
+import os
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from statejobs import scrape  # noqa: E402
+from statejobs.store import JobStore  # noqa: E402
+
+COUNTIES = [f"County {i}" for i in range(50)]
+
+
+def table_html(rows):
+    # Deadlines spread over the coming weeks, so every posting is still open.
+    deadlines = [(datetime.date.today() + datetime.timedelta(days=day)).strftime("%m/%d/%y") for day in range(1, 61)]
+    yield "<html><body><table><thead><tr><th>Item</th></tr></thead><tbody>"
+    for i in range(rows):
+        yield (
+            f"<tr><td>{100000 + i}</td><td>Program Analyst {i % 400}</td><td>{10 + i % 20}</td>"
+            f"<td>01/{1 + i % 28:02d}/25</td><td>{deadlines[i % len(deadlines)]}</td>"
+            f"<td>Department of Agency {i % 150}</td><td>{COUNTIES[i % len(COUNTIES)]}</td></tr>"
+        )
+    yield "</tbody></table></body></html>"
+
+
+def make_handler(rows, table_seconds, detail_delay):
+    body = "".join(table_html(rows)).encode()
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            if self.path.startswith("/table"):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                # Trickle the body out over table_seconds, like a slow server.
+                step = max(1, len(body) // 50)
+                for offset in range(0, len(body), step):
+                    self.wfile.write(body[offset:offset + step])
+                    self.wfile.flush()
+                    time.sleep(table_seconds / 50)
+            else:
+                time.sleep(detail_delay)
+                item_id = self.path.rsplit("=", 1)[-1]
+                page = (
+                    '<html><body><div id="vacancyDetails"><p class="row"><span class="leftCol">Title</span>'
+                    f'<span class="rightCol">Job {item_id}</span></p></div></body></html>'
+                ).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(page)))
+                self.end_headers()
+                self.wfile.write(page)
+
+    return Handler
+
+
+def measure(func):
+    # Timed without tracemalloc, which slows the parsers several times over;
+    # the peak comes from a second, traced run.
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark streaming vacancy-table scraping.")
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--selected-every", type=int, default=50, help="one county in this many is selected")
+    parser.add_argument("--table-seconds", type=float, default=2.0)
+    parser.add_argument("--detail-delay", type=float, default=0.05)
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(args.rows, args.table_seconds, args.detail_delay))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    table_url = f"{base}/table"
+    scrape.DETAIL_URL = f"{base}/detail?id={{item_id}}"
+    counties = COUNTIES[:max(1, len(COUNTIES) // args.selected_every)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        def buffered():
+            store = JobStore(os.path.join(directory, "buffered.sqlite3"))
+            all_jobs = scrape.scrape_vacancy_table(table_url)
+            store.replace_vacancies(all_jobs)
+            selected = store.load_vacancies(counties=counties)
+            details, _, _ = scrape.sync_details(store, all_jobs, selected, max_workers=args.workers)
+            store.close()
+            return all_jobs, details
+
+        def streamed():
+            store = JobStore(os.path.join(directory, "streamed.sqlite3"))
+            all_jobs, details, _, _ = scrape.stream_sync_details(
+                store, scrape.stream_vacancy_table(table_url), counties=counties, max_workers=args.workers
+            )
+            store.replace_vacancies(all_jobs)
+            store.close()
+            return all_jobs, details
+
+        buffered_time, buffered_peak, expected = measure(buffered)
+        streamed_time, streamed_peak, actual = measure(streamed)
+    server.shutdown()
+
+    print(f"{args.rows:,} rows, {len(expected[1]):,} details in {', '.join(counties)}")
+    print(f"{'approach':<10} {'seconds':>8} {'peak MB':>8}")
+    print(f"{'buffered':<10} {buffered_time:>8.2f} {buffered_peak / 2**20:>8.1f}")
+    print(f"{'streamed':<10} {streamed_time:>8.2f} {streamed_peak / 2**20:>8.1f}")
+
+    failed = actual != expected
+    if failed:
+        print("results differ")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,9 +1,17 @@
 import streamlit as st
 import openai
-import json
-import datetime
-import PyPDF2
 import os
+import time
+import uuid
+from statejobs.embeddings import shared_index
+from statejobs.llm import RateLimiter
+from statejobs.llm_cache import ResponseCache
+from statejobs.matching import DEFAULT_BATCH_SIZE, DEFAULT_CONCURRENCY, run_matching
+from statejobs.resume import analyze_resume, extract_resume_text, resume_digest, resume_id
+from statejobs.salary import DEFAULT_TOLERANCE
+from statejobs.sink import JsonlSink, checkpoint_path
+from statejobs.store import JobStore
+from statejobs.worker import shared_runner
 
 st.title("Resume Matching")
 
@@ -22,47 +30,60 @@ st.markdown("""
 
 openai.api_key = os.getenv("OPENAI_API_KEY")
 
+
+@st.cache_resource
+def get_job_store():
+    return JobStore()
+
+
+@st.cache_resource
+def get_llm_cache():
+    return ResponseCache()
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def cached_resume_text(digest, _resume_bytes, filetype):
+    # Leading underscore: Streamlit hashes only the digest, not the bytes.
+    return extract_resume_text(_resume_bytes, filetype)
+
+
+store = get_job_store()
+llm_cache = get_llm_cache()
+runner = shared_runner()
+session_id = st.session_state.setdefault('session_id', uuid.uuid4().hex)
+
 if 'job_details' not in st.session_state or not st.session_state.job_details:
+    st.session_state.job_details = store.load_details()
+
+if not st.session_state.job_details:
     st.write("No job details available. Please return to the main page and scrape data first.")
 else:
     resume_file = st.file_uploader("Upload your resume (PDF or TXT):", type=['pdf', 'txt'], key="resume_upload")
     if resume_file is not None:
         filetype = resume_file.name.split('.')[-1].lower()
-        resume_text = ""
-        if filetype == 'pdf':
-            pdf_reader = PyPDF2.PdfReader(resume_file)
-            for page in pdf_reader.pages:
-                resume_text += page.extract_text() + "\n"
-        else:
-            resume_text = resume_file.read().decode('utf-8', errors='ignore')
+        # Streamlit reruns this script on every widget change, so extraction
+        # and analysis are cached by the SHA-256 of the uploaded bytes.
+        resume_bytes = resume_file.getvalue()
+        digest = resume_digest(resume_bytes)
+        resume_text = cached_resume_text(digest, resume_bytes, filetype)
 
         st.session_state.last_resume_text = resume_text
 
+        analyses = st.session_state.setdefault('resume_analyses', {})
+        if st.session_state.get('resume_digest') != digest:
+            # A different resume: restore its earlier analysis or clear the old one.
+            analysis = analyses.get(digest, {})
+            st.session_state.candidate_domain = analysis.get("candidate_domain", "")
+            st.session_state.candidate_salary_range = analysis.get("candidate_salary_range", "")
+            st.session_state.resume_digest = digest
+
         # Step 1: Infer candidate's domain and salary range from resume
         if st.button("Analyze Resume for Domain & Salary", key="analyze_resume_button"):
-            analysis_prompt = f"""
-You are an expert career advisor. Analyze the candidate's resume below and infer the candidate's professional domain (e.g. "Nursing", "Data Engineering", "Accounting", "Teaching", etc.) and provide a reasonable current salary range based on their experience and role indicated in the resume. Be practical and consider typical salaries for the given role and experience level.
-
-Resume:
-{resume_text}
-
-Respond in JSON with the following format:
-{{
-  "candidate_domain": "string describing domain",
-  "candidate_salary_range": "string describing approximate current salary range, e.g. '$70,000-$90,000'"
-}}
-"""
             try:
-                completion = openai.chat.completions.create(
-                    model="gpt-4o-mini",
-                    messages=[{"role": "system", "content": analysis_prompt}],
-                    max_tokens=300,
-                    temperature=0.0
-                )
-                response = completion.choices[0].message.content.strip()
-                parsed = json.loads(response)
-                st.session_state.candidate_domain = parsed.get("candidate_domain", "")
-                st.session_state.candidate_salary_range = parsed.get("candidate_salary_range", "")
+                if digest not in analyses:
+                    analyses[digest] = analyze_resume(resume_text, cache=llm_cache)
+                st.session_state.candidate_domain = analyses[digest]["candidate_domain"]
+                st.session_state.candidate_salary_range = analyses[digest]["candidate_salary_range"]
                 st.success("Domain and salary range inferred successfully!")
                 st.write("**Candidate Domain:**", st.session_state.candidate_domain)
                 st.write("**Candidate Salary Range:**", st.session_state.candidate_salary_range)
@@ -71,121 +92,135 @@ Respond in JSON with the following format:
 
         # Step 2: Run Matching
         if 'candidate_domain' in st.session_state and 'candidate_salary_range' in st.session_state and st.session_state.candidate_domain and st.session_state.candidate_salary_range:
+            batch_size = st.number_input(
+                "Jobs per LLM request (1 = one request per job)",
+                min_value=1, max_value=25, value=DEFAULT_BATCH_SIZE, key="matching_batch_size"
+            )
+            concurrency = st.number_input(
+                "Concurrent LLM requests", min_value=1, max_value=64, value=DEFAULT_CONCURRENCY, key="matching_concurrency"
+            )
+            semantic_top_k = st.number_input(
+                "Keep only the N jobs most similar to your resume (embedding ranking, 0 = off)",
+                min_value=0, value=0, key="semantic_top_k"
+            )
+            prerank_mode = st.selectbox(
+                "Pre-rank jobs locally before sending them to the LLM",
+                ["Off", "Top N jobs", "Relevance threshold"],
+                key="prerank_mode"
+            )
+            top_n = None
+            min_score = None
+            if prerank_mode == "Top N jobs":
+                top_n = int(st.number_input("Jobs to send to the LLM", min_value=1, value=50, key="prerank_top_n"))
+            elif prerank_mode == "Relevance threshold":
+                min_score = st.slider("Minimum relevance (best job = 1.0)", 0.0, 1.0, 0.2, key="prerank_min_score")
+            salary_mode = st.selectbox(
+                "Jobs far outside your salary range",
+                ["Send to the LLM last", "Skip without an LLM call", "Treat like any other job"],
+                key="salary_mode"
+            )
+            salary_tolerance = st.slider(
+                "Salary gap tolerance (share of your range's midpoint)", 0.0, 1.0, DEFAULT_TOLERANCE, key="salary_tolerance"
+            )
+            requests_per_minute = st.number_input("Requests per minute limit (0 = unlimited)", min_value=0, value=500, key="matching_rpm")
+            tokens_per_minute = st.number_input("Tokens per minute limit (0 = unlimited)", min_value=0, value=200000, key="matching_tpm")
             if st.button("Run Matching", key="run_matching_button"):
-                details = st.session_state.job_details
-                jobs = list(details.values())
-                total = len(jobs)
-                results = []
-
-                progress_bar = st.progress(0)
-                status_text = st.empty()
-
-                # Add instructions on how to determine good/minimum/no match
-                # Good match: meets min qual, domain aligns, salary close
-                # Minimum: meets min qual but not domain or salary not aligned
-                # No match: does not meet min qual
-
-                for i, job in enumerate(jobs):
-                    progress_bar.progress(int((i+1)/total*100))
-                    status_text.text(f"Processing job {i+1} of {total}...")
-
-                    if 'error' in job:
-                        results.append({
-                            "item_number": job['item_number'],
-                            "job_title": job.get('job_title', ''),
-                            "resume_match_level": "no match",
-                            "match_explanation": "Job details could not be retrieved."
-                        })
-                        continue
-
-                    min_qual = job.get("minimum_qualifications", "").strip()
-                    if not min_qual:
-                        results.append({
-                            "item_number": job['item_number'],
-                            "job_title": job.get('job_title', ''),
-                            "resume_match_level": "no match",
-                            "match_explanation": "No minimum qualifications listed."
-                        })
-                        continue
-
-                    job_title = job.get('job_title', '')
-                    salary_range = job.get('salary_range', '')  # might be something like "$42,939 to $52,989 Annually"
-                    # We'll rely on the LLM to interpret salary_range and domain alignment.
-                    # Additional domain cues might come from 'agency' or 'duties_description'.
-
-                    matching_prompt = f"""
-You are a professional career advisor. Classify the match of this candidate to the following job:
-
-Candidate Domain: {st.session_state.candidate_domain}
-Candidate Current Salary Range: {st.session_state.candidate_salary_range}
-
-Job Details:
-Title: {job_title}
-Salary Range: {salary_range}
-Minimum Qualifications: {min_qual}
-Duties: {job.get('duties_description', '')}
-Agency: {job.get('agency', '')}
-
-The candidate's resume:
-{resume_text}
-
-Criteria:
-- The candidate must meet the minimum qualifications for the job to be at least "minimum".
-- The candidate's domain should align with the job's domain to be considered "good".
-- The job’s salary range should be reasonably close to the candidate’s current salary range for a "good" match.
-- If the candidate meets minimum qualifications but domain or salary are not well aligned, then "minimum".
-- If the candidate does not meet minimum qualifications, then "no match".
-- If the candidate meets minimum qualifications and both domain alignment and salary proximity are good, then "good".
-
-DO NOT include triple backticks or code fences. Only return a pure JSON object. 
-Your response MUST be a valid JSON object and must have the following structure:
-{{
-  "resume_match_level": "minimum" | "good" | "no match",
-  "match_explanation": "A brief explanation here."
-}}
-"""
-                    try:
-                        completion = openai.chat.completions.create(
-                            model="gpt-4o-mini",
-                            messages=[{"role": "system", "content": matching_prompt}],
-                            max_tokens=300,
-                            temperature=0.0
+                jobs = list(st.session_state.job_details.values())
+                candidate_domain = st.session_state.candidate_domain
+                candidate_salary_range = st.session_state.candidate_salary_range
+                semantic_index = shared_index() if semantic_top_k else None
+                rid = resume_id(resume_text)
+                checkpoint = f"matches_{rid}"
+
+                def matching_task(task):
+                    # Runs on a worker thread: report through the task, never st.*.
+                    # Results are checkpointed per resume as they arrive; a
+                    # cancelled or interrupted run picks up where it stopped.
+                    with JsonlSink(checkpoint_path(checkpoint)) as sink:
+                        results, stats = run_matching(
+                            jobs,
+                            resume_text,
+                            candidate_domain,
+                            candidate_salary_range,
+                            batch_size=int(batch_size),
+                            concurrency=int(concurrency),
+                            # OPENAI_BASE_URL is honoured, e.g. to point at tools/mock_openai_server.py
+                            client=openai.AsyncOpenAI(api_key=openai.api_key, max_retries=0),
+                            limiter=RateLimiter(int(requests_per_minute), int(tokens_per_minute)),
+                            cache=llm_cache,
+                            top_n=top_n,
+                            min_score=min_score,
+                            salary_mode={
+                                "Send to the LLM last": "deprioritize",
+                                "Skip without an LLM call": "skip"
+                            }.get(salary_mode, "off"),
+                            salary_tolerance=salary_tolerance,
+                            semantic_index=semantic_index,
+                            semantic_top_k=int(semantic_top_k) or None,
+                            on_progress=lambda done, total: task.progress(done, total),
+                            sink=sink
                         )
-                        response = completion.choices[0].message.content.strip()
-                        try:
-                            parsed = json.loads(response)
-                            match_level = parsed.get("resume_match_level", "no match").lower()
-                            explanation = parsed.get("match_explanation", "")
-                        except json.JSONDecodeError:
-                            match_level = "no match"
-                            explanation = f"Error during evaluation: Unable to parse JSON. Raw response: {response}"
-                    except Exception as e:
-                        match_level = "no match"
-                        explanation = f"Error during evaluation: {e}"
-
-                    results.append({
-                        "item_number": job['item_number'],
-                        "job_title": job_title,
-                        "resume_match_level": match_level,
-                        "match_explanation": explanation
-                    })
-
-                st.session_state.resume_matches = results
-                st.success("Resume matching completed!")
-
-                # Display results
-                for r in results:
-                    st.write(f"**{r['job_title']}** (Item {r['item_number']}): {r['resume_match_level'].title()}")
-                    st.write(r['match_explanation'])
-                    if r['item_number'] in st.session_state.job_details:
-                        with st.expander("View Job Details"):
-                            st.json(st.session_state.job_details[r['item_number']])
-
-                if st.button("Save Resume Match Results", key="save_results_button"):
-                    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-                    results_path = f"resume_matches_{timestamp}.json"
-                    with open(results_path, "w", encoding="utf-8") as f:
-                        json.dump(results, f, ensure_ascii=False, indent=2)
-                    st.success(f"Saved resume match results to {results_path}")
+                        store.upsert_matches(results, rid)
+                        sink.discard()
+                    return {"results": results, "stats": stats, "semantic_top_k": int(semantic_top_k)}
+
+                # Matching the same resume again while a run is going joins it.
+                st.session_state.matching_task = runner.submit(
+                    "matching", matching_task, owner=session_id, label=f"{len(jobs)} jobs for resume {rid}",
+                    key=checkpoint
+                )
         else:
             st.info("Please analyze your resume first for domain and salary before running matching.")
+
+# Outside the uploader and analysis branches: a run keeps being shown, and
+# its result collected, after the resume is changed or removed.
+task_id = st.session_state.get('matching_task')
+status = runner.status(task_id) if task_id else None
+if status and status["state"] in ("queued", "running"):
+    total = status["total"] or 1
+    st.progress(status["done"] / total, text=f"Processing job {status['done']} of {status['total']} ({status['state']})...")
+    if st.button("Cancel", key="cancel_matching_button"):
+        runner.cancel(task_id)
+    time.sleep(1)
+    st.rerun()
+elif status:
+    st.session_state.matching_task = None
+    if status["state"] == "done":
+        result = runner.result(task_id)
+        results, stats = result["results"], result["stats"]
+        st.caption(
+            f"{stats['llm_calls']} LLM calls: {stats['prompt_tokens']:,} prompt tokens "
+            f"({stats['cached_tokens']:,} served from the provider's prompt cache), "
+            f"{stats['completion_tokens']:,} completion tokens"
+        )
+        if 'matching_runs' not in st.session_state:
+            st.session_state.matching_runs = []
+        st.session_state.matching_runs.append(stats)
+        st.write(
+            f"{stats['resumed']} jobs resumed from an interrupted run, "
+            f"{stats['expired']} jobs past their application deadline, "
+            f"{stats['salary_skipped']} jobs skipped on salary, "
+            f"{stats['semantic_pruned']} jobs outside the semantic top {result['semantic_top_k']}, "
+            f"{stats['pruned']} jobs pruned by pre-ranking, "
+            f"{stats['llm_jobs']} jobs sent to the LLM in batches of {stats['batch_size']} "
+            f"with {stats['concurrency']} concurrent requests: "
+            f"{stats['tokens_per_job']:.0f} tokens/job, {stats['seconds_per_job']:.2f} s/job "
+            f"({stats['fallbacks']} per-job fallbacks, {stats['cache_hits']} served from the response cache)"
+        )
+        with st.expander("Compare matching runs"):
+            st.dataframe(st.session_state.matching_runs)
+
+        st.session_state.resume_matches = results
+        st.success("Resume matching completed! Results saved to the job store.")
+
+        # Display results
+        for r in results:
+            st.write(f"**{r['job_title']}** (Item {r['item_number']}): {r['resume_match_level'].title()}")
+            st.write(r['match_explanation'])
+            if r['item_number'] in st.session_state.job_details:
+                with st.expander("View Job Details"):
+                    st.json(st.session_state.job_details[r['item_number']])
+    elif status["state"] == "cancelled":
+        st.warning(f"Matching cancelled after {status['done']} of {status['total']} jobs; run it again to resume.")
+    else:
+        st.error(f"Error running matching: {status['error']}")
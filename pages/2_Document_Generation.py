@@ -1,8 +1,14 @@
 import streamlit as st
 import openai
 import os
-import datetime
-import json
+import time
+from statejobs.docgen import COVER_LETTER_TEMPLATE, DEFAULT_OUTPUT_DIR, RESUME_TEMPLATE, load_template
+from statejobs.docgen import InstructionMemo
+from statejobs.docgen import generate_docs_for_jobs as generate_docs
+from statejobs.llm import UsageMeter
+from statejobs.llm_cache import ResponseCache
+from statejobs.store import JobStore
+from statejobs.taskgraph import DEFAULT_CONCURRENCY
 
 st.title("Application Document Generation")
 
@@ -20,23 +26,41 @@ st.markdown("""
 
 openai.api_key = os.getenv("OPENAI_API_KEY")
 
+
+@st.cache_resource
+def get_job_store():
+    return JobStore()
+
+
+@st.cache_resource
+def get_llm_cache():
+    return ResponseCache()
+
+
+store = get_job_store()
+llm_cache = get_llm_cache()
+
+# Pick up the last stored run when this page is opened in a fresh session.
 if 'resume_matches' not in st.session_state or len(st.session_state.resume_matches) == 0:
+    st.session_state.resume_matches = store.load_matches()
+if 'job_details' not in st.session_state or not st.session_state.job_details:
+    st.session_state.job_details = store.load_details([m['item_number'] for m in st.session_state.resume_matches])
+if 'filtered_jobs' not in st.session_state or not st.session_state.filtered_jobs:
+    st.session_state.filtered_jobs = store.load_vacancies()
+
+if len(st.session_state.resume_matches) == 0:
     st.write("No resume matches found. Please run the resume matching page first.")
 else:
     matches = st.session_state.resume_matches
     # Load templates
-    cover_letter_template = ""
-    resume_template = ""
-    if os.path.exists("cover_letter_template.txt"):
-        with open("cover_letter_template.txt", "r", encoding="utf-8") as f:
-            cover_letter_template = f.read()
-    else:
-        st.error("cover_letter_template.txt not found.")
-    if os.path.exists("resume_template.txt"):
-        with open("resume_template.txt", "r", encoding="utf-8") as f:
-            resume_template = f.read()
-    else:
-        st.error("resume_template.txt not found.")
+    cover_letter_template = load_template(COVER_LETTER_TEMPLATE)
+    if cover_letter_template is None:
+        cover_letter_template = ""
+        st.error(f"{COVER_LETTER_TEMPLATE} not found.")
+    resume_template = load_template(RESUME_TEMPLATE)
+    if resume_template is None:
+        resume_template = ""
+        st.error(f"{RESUME_TEMPLATE} not found.")
 
     applicable_jobs = [m for m in matches if m['resume_match_level'] in ['minimum', 'good']]
 
@@ -51,6 +75,18 @@ else:
         )
 
         comment_box = st.text_area("Add comments or notes for refinement (optional):", key="comment_box")
+        reuse_documents = st.checkbox(
+            "Reuse previously generated cover letters and resumes for identical requests",
+            value=False, key="reuse_documents",
+            help="Instructions and change explanations are always reused; tick this to also reuse the creative documents."
+        )
+        concurrency = st.number_input(
+            "Concurrent LLM requests", min_value=1, max_value=64, value=DEFAULT_CONCURRENCY, key="docs_concurrency"
+        )
+        stream_documents = st.checkbox(
+            "Show documents as they are written", value=True, key="stream_documents",
+            help="Streams each document token by token into the page and its output file."
+        )
 
         # Ensure we have the last resume text
         if 'last_resume_text' not in st.session_state or not st.session_state.last_resume_text.strip():
@@ -61,141 +97,79 @@ else:
         else:
             resume_text = st.session_state.last_resume_text
 
-            def generate_from_template(doc_type, job, resume_text, notes, template):
-                # job details
-                job_details = st.session_state.job_details[job['item_number']]
-                job_title = job_details.get('job_title', '')
-                agency = job_details.get('agency', '')
-                # Some job details may not have agency explicitly stored; if not, get from filtered_jobs if needed
-                if not agency:
-                    # Attempt to find from filtered jobs
-                    for j in st.session_state.filtered_jobs:
-                        if j['item_number'] == job['item_number']:
-                            agency = j.get('agency', '')
-                            break
-
-                relevant_experience = "the qualifications and experience mentioned in the candidate's resume"
-
-                prompt = f"""
-You are an expert career services writer. Using the provided template, tailor the {doc_type} specifically for this job.
-
-Job Details:
-Title: {job_title}
-Agency: {agency}
-Minimum Qualifications: {job_details.get('minimum_qualifications', '')}
-Duties: {job_details.get('duties_description', '')}
-Location: {job_details.get('location', '')}
-Application Procedure: {job_details.get('application_procedure', '')}
-
-Candidate's Original Resume:
-{resume_text}
-
-Notes from Candidate:
-{notes}
-
-Template:
-{template}
-
-Instructions:
-- Incorporate the job title, agency, and relevant experience into the template.
-- Maintain a professional, expert tone.
-- For the resume, highlight the most relevant experience and skills based on the job requirements.
-- Output ONLY the full {doc_type} text with no extra commentary.
-"""
-                completion = openai.chat.completions.create(
-                    model="gpt-4o-mini",
-                    messages=[{"role": "system", "content": prompt}],
-                    max_tokens=2000,
-                    temperature=0.7
-                )
-                return completion.choices[0].message.content.strip()
-
-            def generate_application_instructions(job, notes):
-                job_details = st.session_state.job_details[job['item_number']]
-                application_procedure = job_details.get('application_procedure', '')
-
-                prompt = f"""
-You are an expert career coach. Provide a clear, step-by-step set of instructions for the candidate to apply to this job based on the following application procedure. Be concise, but thorough. If the instructions involve emailing a resume and cover letter, specify subject lines and formats. If a weblink is involved, specify how to navigate there and what to fill out. If forms need to be completed, mention them.
-
-Application Procedure:
-{application_procedure}
-
-Notes from Candidate:
-{notes}
-
-Respond with a numbered list of steps that the candidate should follow to apply.
-"""
-                completion = openai.chat.completions.create(
-                    model="gpt-4o-mini",
-                    messages=[{"role": "system", "content": prompt}],
-                    max_tokens=1000,
-                    temperature=0.0
-                )
-                return completion.choices[0].message.content.strip()
-
-            def explain_resume_changes(original_resume, tailored_resume):
-                prompt = f"""
-You are a professional editor. You have the candidate's original resume and a newly tailored version. Explain in a short paragraph what changes and additions were made in the tailored resume compared to the original, focusing on how it was customized for the specific job.
-
-Original Resume:
-{original_resume}
-
-Tailored Resume:
-{tailored_resume}
-"""
-                completion = openai.chat.completions.create(
-                    model="gpt-4o-mini",
-                    messages=[{"role": "system", "content": prompt}],
-                    max_tokens=500,
-                    temperature=0.0
-                )
-                return completion.choices[0].message.content.strip()
-
             def generate_docs_for_jobs(selected_jobs):
                 if not selected_jobs:
                     st.warning("No jobs selected for document generation.")
                     return
-                timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-                output_dir = "generated_documents"
-                os.makedirs(output_dir, exist_ok=True)
-
-                for selected_job_str in selected_jobs:
-                    parts = selected_job_str.split(" - ")
-                    item_id = parts[0].strip()
-                    job_obj = [m for m in matches if m['item_number'] == item_id][0]
-
-                    # Generate cover letter
-                    cover_letter = generate_from_template("cover letter", job_obj, resume_text, comment_box, cover_letter_template)
-                    cl_path = os.path.join(output_dir, f"{item_id}_cover_letter_{timestamp}.txt")
-                    with open(cl_path, "w", encoding="utf-8") as f:
-                        f.write(cover_letter)
-
-                    # Generate tailored resume
-                    tailored_resume = generate_from_template("resume", job_obj, resume_text, comment_box, resume_template)
-                    tr_path = os.path.join(output_dir, f"{item_id}_resume_{timestamp}.txt")
-                    with open(tr_path, "w", encoding="utf-8") as f:
-                        f.write(tailored_resume)
-
-                    # Generate explanation of resume changes
-                    changes_explanation = explain_resume_changes(resume_text, tailored_resume)
-
-                    # Generate application instructions
-                    instructions = generate_application_instructions(job_obj, comment_box)
-                    ai_path = os.path.join(output_dir, f"{item_id}_instructions_{timestamp}.txt")
-                    with open(ai_path, "w", encoding="utf-8") as f:
-                        f.write(instructions)
-
-                    st.success(f"Documents generated for job {item_id}!")
-                    st.markdown("**Cover Letter:**")
-                    st.text(cover_letter)
-                    st.markdown("**Tailored Resume:**")
-                    st.text(tailored_resume)
-                    st.markdown("**Explanation of Resume Changes:**")
-                    st.text(changes_explanation)
-                    st.markdown("**Application Instructions:**")
-                    st.text(instructions)
-
-                st.write("Check the 'generated_documents' folder for the output files.")
+                item_ids = [selected_job_str.split(" - ")[0].strip() for selected_job_str in selected_jobs]
+                # Some job details may not have agency explicitly stored; fall back to the vacancy table.
+                agencies = {j['item_number']: j.get('agency', '') for j in st.session_state.filtered_jobs}
+                meter = UsageMeter()
+                memo = InstructionMemo()
+
+                # One slot per document, laid out up front so concurrently
+                # generated jobs each fill in their own section.
+                sections = [
+                    ("cover_letter", "Cover Letter"),
+                    ("resume", "Tailored Resume"),
+                    ("changes", "Explanation of Resume Changes"),
+                    ("instructions", "Application Instructions")
+                ]
+                status = {}
+                slots = {}
+                for item_id in item_ids:
+                    status[item_id] = st.empty()
+                    status[item_id].info(f"Generating documents for job {item_id}...")
+                    for kind, title in sections:
+                        st.markdown(f"**{title}:**")
+                        slots[(item_id, kind)] = st.empty()
+                streamed = {}
+                last_render = {}
+
+                def show_tokens(item_id, kind, delta):
+                    # Runs on this script thread (the event loop lives here);
+                    # redraw at most ten times a second per document.
+                    key = (item_id, kind)
+                    streamed[key] = streamed.get(key, "") + delta
+                    now = time.monotonic()
+                    if now - last_render.get(key, 0.0) >= 0.1:
+                        slots[key].text(streamed[key])
+                        last_render[key] = now
+
+                def show_docs(item_id, docs):
+                    if 'error' in docs:
+                        status[item_id].error(f"Error generating documents for job {item_id}: {docs['error']}")
+                    else:
+                        status[item_id].success(f"Documents generated for job {item_id}!")
+                    for kind, _ in sections:
+                        slots[(item_id, kind)].text(docs.get(kind, ""))
+
+                generate_docs(
+                    item_ids, st.session_state.job_details, agencies, resume_text, comment_box,
+                    cover_letter_template, resume_template, output_dir=DEFAULT_OUTPUT_DIR,
+                    concurrency=int(concurrency),
+                    # OPENAI_BASE_URL is honoured, e.g. to point at tools/mock_openai_server.py
+                    client=openai.AsyncOpenAI(api_key=openai.api_key, max_retries=0),
+                    cache=llm_cache, reuse_documents=reuse_documents, meter=meter, memo=memo,
+                    stream=stream_documents, on_token=show_tokens, on_job_done=show_docs
+                )
+
+                st.write(f"Check the '{DEFAULT_OUTPUT_DIR}' folder for the output files.")
+                cache_stats = llm_cache.stats()
+                usage = meter.totals()
+                dedup = memo.stats()
+                st.caption(
+                    f"Application instructions: {dedup['requests']} jobs share {dedup['distinct']} distinct procedures "
+                    f"({dedup['dedup_ratio']:.0%} deduplicated); {dedup['generated']} generated, "
+                    f"{dedup['from_cache']} reused from earlier runs"
+                )
+                st.caption(
+                    f"{usage['calls']} LLM calls this run: {usage['prompt_tokens']:,} prompt tokens "
+                    f"({usage['cached_tokens']:,} served from the provider's prompt cache), "
+                    f"{usage['completion_tokens']:,} completion tokens, {usage['cache_hits']} local cache hits. "
+                    f"LLM response cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses "
+                    f"across all sessions since the app started"
+                )
 
             col1, col2, col3 = st.columns([1,1,1])
 
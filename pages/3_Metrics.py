@@ -0,0 +1,47 @@
+import streamlit as st
+import os
+from statejobs.metrics import METRICS
+
+st.title("Run Metrics")
+
+st.markdown("""
+**Instructions:**
+1. Turn on timing collection, then scrape, match or generate documents on the other pages.
+2. Come back here to see where the time went: p50/p95 latency per stage plus bytes, retries and tokens.
+3. Export writes a Prometheus text file and a JSON summary to the metrics folder.
+""")
+
+enabled = st.checkbox("Collect timing metrics", value=METRICS.enabled, key="metrics_enabled")
+METRICS.enable(enabled)
+
+col1, col2 = st.columns([1, 1])
+with col1:
+    if st.button("Reset metrics", key="reset_metrics_button"):
+        METRICS.reset()
+with col2:
+    export = st.button("Export metrics", key="export_metrics_button")
+
+summary = METRICS.summary()
+if not summary["stages"]:
+    st.write("No spans recorded yet.")
+else:
+    st.dataframe([
+        {
+            "stage": stage,
+            "calls": stats["count"],
+            "errors": stats["errors"],
+            "p50 (ms)": round(stats["p50"] * 1000, 1),
+            "p95 (ms)": round(stats["p95"] * 1000, 1),
+            "max (ms)": round(stats["max"] * 1000, 1),
+            "total (s)": round(stats["seconds_total"], 2)
+        }
+        for stage, stats in summary["stages"].items()
+    ])
+    st.json(summary["counters"])
+
+if export:
+    output_dir = "metrics"
+    METRICS.write_prometheus(os.path.join(output_dir, "statejobs.prom"))
+    summary_path = os.path.join(output_dir, f"run_{int(summary['started_at'])}.json")
+    METRICS.write_summary(summary_path)
+    st.success(f"Wrote {os.path.join(output_dir, 'statejobs.prom')} and {summary_path}")
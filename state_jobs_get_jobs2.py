@@ -1,23 +1,49 @@
-import streamlit as st
-import requests
-from bs4 import BeautifulSoup
-import json
 import datetime
-import re
+import hashlib
+import time
+import uuid
+
+import streamlit as st
+from statejobs import scrape
+from statejobs.cache import DEFAULT_TTL, DetailCache
+from statejobs.embeddings import shared_index
+from statejobs.fetch import DEFAULT_WORKERS
+from statejobs.jobtable import JobTable
+from statejobs.scrape import VACANCY_URL, sync_details
+from statejobs.sink import JsonlSink, checkpoint_path
+from statejobs.store import JobStore
+from statejobs.worker import shared_runner
 
 st.set_page_config(page_title="Job Matching Application", page_icon="📝", layout="wide")
 
-# Initialize session state
+
+@st.cache_resource
+def get_job_store():
+    return JobStore()
+
+
+store = get_job_store()
+# Shared by every session: scrapes and matching runs outlive the page rerun
+# (or closed tab) that started them.
+runner = shared_runner()
+
+# Initialize session state, starting from the last stored scrape
 if 'jobs_data' not in st.session_state:
-    st.session_state.jobs_data = []
+    st.session_state.jobs_data = store.load_vacancies()
+if 'job_table' not in st.session_state:
+    # Columnar copy of jobs_data with facet indexes, rebuilt only on a new scrape.
+    st.session_state.job_table = JobTable(st.session_state.jobs_data)
 if 'filtered_jobs' not in st.session_state:
     st.session_state.filtered_jobs = []
 if 'job_details' not in st.session_state:
     st.session_state.job_details = {}
 if 'resume_matches' not in st.session_state:
-    st.session_state.resume_matches = []
+    st.session_state.resume_matches = store.load_matches()
 if 'selected_jobs_for_docs' not in st.session_state:
     st.session_state.selected_jobs_for_docs = []
+if 'session_id' not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
+session_id = st.session_state.session_id
 
 st.title("Job Scraping and Filtering")
 
@@ -26,239 +52,155 @@ st.markdown("""
 1. Click "Scrape State Jobs" to fetch the latest vacancy table data from StateJobsNY.
 2. Filter jobs by county.
 3. Scrape detailed job information for filtered jobs.
-4. Save filtered job data for downstream pages.
+4. Scraped jobs, details and match results are stored in statejobs.sqlite3 and reloaded by every page.
 """)
 
-VACANCY_URL = "https://statejobs.ny.gov/employees/vacancyTable.cfm?searchResults=Yes&Keywords=&title=&JurisClassID=&AgID=&isnyhelp=&minDate=&maxDate=&employmentType=&gradeCompareType=GT&grade=&SalMin="
 def scrape_vacancy_table(url):
     try:
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        content = response.text
-        soup = BeautifulSoup(content, 'html.parser')
-        rows = soup.select('table tbody tr')
-        jobs = []
-        for row in rows:
-            cols = row.find_all('td')
-            if len(cols) < 7:
-                continue
-            item_number = cols[0].get_text(strip=True)
-            job_title = cols[1].get_text(strip=True)
-            salary_grade = cols[2].get_text(strip=True)
-            posting_date = cols[3].get_text(strip=True)
-            application_deadline = cols[4].get_text(strip=True)
-            agency = cols[5].get_text(strip=True)
-            county = cols[6].get_text(strip=True)
-
-            jobs.append({
-                "item_number": item_number,
-                "job_title": job_title,
-                "salary_grade": salary_grade,
-                "posting_date": posting_date,
-                "application_deadline": application_deadline,
-                "agency": agency,
-                "county": county
-            })
-
-        return jobs
+        return scrape.scrape_vacancy_table(url)
     except Exception as e:
         st.error(f"Error fetching the vacancy table: {e}")
         return []
 
 
-
-def scrape_job_details(item_id):
-    detail_url = f"https://statejobs.ny.gov/employees/vacancyDetailsPrint.cfm?id={item_id}"
-    resp = requests.get(detail_url, timeout=10)
-    resp.raise_for_status()
-    detail_soup = BeautifulSoup(resp.text, 'html.parser')
-    
-    # Extract posting date, application deadline, vacancy ID
-    posting_date = ""
-    application_deadline = ""
-    vacancy_id = item_id
-    top_header = detail_soup.find('h2', text="Review Vacancy")
-    if top_header:
-        top_p = top_header.find_next('p')
-        if top_p:
-            text = top_p.get_text(" ", strip=True)
-            date_posted_match = re.search(r"Date Posted:\s*(\d{1,2}/\d{1,2}/\d{2})", text)
-            app_due_match = re.search(r"Applications Due:\s*(\d{1,2}/\d{1,2}/\d{2})", text)
-            vacancy_id_match = re.search(r"Vacancy ID:\s*(\d+)", text)
-            if date_posted_match:
-                posting_date = date_posted_match.group(1)
-            if app_due_match:
-                application_deadline = app_due_match.group(1)
-            if vacancy_id_match:
-                vacancy_id = vacancy_id_match.group(1)
-
-    # Initialize fields
-    job_title = ""
-    minimum_qualifications = ""
-    preferred_qualifications = ""  # not present in this example
-    duties_description = ""
-    salary_range = ""
-    location = ""
-    application_procedure = ""
-    contact_information = ""
-
-    vacancy_details = detail_soup.find('div', id='vacancyDetails')
-    fields_map = {}
-
-    if vacancy_details:
-        # Extract fields from all <p class="row">
-        # These are scattered after various <h3> headings.
-        # We'll just loop through all <p class="row"> inside #vacancyDetails.
-        for p in vacancy_details.find_all('p', class_='row'):
-            left = p.find('span', class_='leftCol')
-            right = p.find('span', class_='rightCol')
-            if left and right:
-                key = left.get_text(strip=True)
-                val = right.get_text(" ", strip=True)
-                fields_map[key] = val
-
-    # Known fields:
-    job_title = fields_map.get("Title", "")
-    duties_description = fields_map.get("Duties Description", "")
-    minimum_qualifications = fields_map.get("Minimum Qualifications", "")
-    salary_range = fields_map.get("Salary Range", "")
-
-    # Location:
-    street_address = fields_map.get("Street Address", "")
-    city = fields_map.get("City", "")
-    state = fields_map.get("State", "")
-    zip_code = fields_map.get("Zip Code", "")
-    location_pieces = [street_address, city, state, zip_code]
-    location = ", ".join([p for p in location_pieces if p.strip()])
-
-    # Application Procedure (Notes on Applying)
-    application_procedure = fields_map.get("Notes on Applying", "")
-
-    # Contact Information:
-    contact_name = fields_map.get("Name", "")
-    contact_phone = fields_map.get("Telephone", "")
-    contact_fax = fields_map.get("Fax", "")
-    contact_email = fields_map.get("Email Address", "")
-    contact_street = fields_map.get("Street", "")
-    # These City/State/Zip Code might conflict with main location fields if repeated under contact info.
-    # But from the given structure, contact info reuses fields like "City", "State", "Zip Code".
-    # We'll just trust that location was already captured and that these are under Contact as well.
-    # To differentiate, we must note that Contact Info appears after "Contact Information" heading.
-    # We'll re-parse after the "Contact Information" <h3> if needed.
-    # For simplicity, use what we have:
-    # In the given example, fields_map is global, so city/state/zip_code may refer to either section.
-    # We'll trust that these fields after "Contact Information" heading override previous ones.
-    # To refine, we can re-check the HTML:
-    # The contact info includes a separate "Street", "City", "State", "Zip Code" after "h5 class='heading' Address"
-    # Since we didn't differentiate sections, let's just combine all contact address info again:
-    
-    # Attempt to find fields after "Contact Information" heading to re-derive contact address:
-    contact_info_section = vacancy_details.find('h3', text="Contact Information")
-    contact_address = ""
-    if contact_info_section:
-        # After Contact Information h3, we have fields:
-        # We'll find them again here specifically.
-        address_map = {}
-        nxt = contact_info_section.find_next_sibling()
-        while nxt and (nxt.name != 'h3'):
-            if nxt.name == 'p' and 'row' in nxt.get('class', []):
-                l = nxt.find('span', class_='leftCol')
-                r = nxt.find('span', class_='rightCol')
-                if l and r:
-                    address_map[l.get_text(strip=True)] = r.get_text(" ", strip=True)
-            nxt = nxt.find_next_sibling()
-
-        # Rebuild contact info with these fields
-        contact_street = address_map.get("Street", contact_street)
-        contact_city = address_map.get("City", "")
-        contact_state = address_map.get("State", "")
-        contact_zip = address_map.get("Zip Code", "")
-        contact_addr_pieces = [contact_street, contact_city, contact_state, contact_zip]
-        contact_address = ", ".join([p for p in contact_addr_pieces if p.strip()])
-
-    contact_info_parts = []
-    if contact_name:
-        contact_info_parts.append(f"Name: {contact_name}")
-    if contact_phone:
-        contact_info_parts.append(f"Phone: {contact_phone}")
-    if contact_fax:
-        contact_info_parts.append(f"Fax: {contact_fax}")
-    if contact_email:
-        contact_info_parts.append(f"Email: {contact_email}")
-    if contact_address:
-        contact_info_parts.append(f"Address: {contact_address}")
-
-    contact_information = "\n".join(contact_info_parts)
-
-    return {
-        "item_number": vacancy_id,
-        "posting_date": posting_date,
-        "application_deadline": application_deadline,
-        "job_title": job_title,
-        "minimum_qualifications": minimum_qualifications,
-        "preferred_qualifications": preferred_qualifications,
-        "duties_description": duties_description,
-        "salary_range": salary_range,
-        "location": location,
-        "application_procedure": application_procedure,
-        "contact_information": contact_information
-    }
-
-def filter_jobs_by_county(jobs, selected_counties):
-    if selected_counties:
-        return [job for job in jobs if job['county'] in selected_counties]
-    return jobs
-
+@st.cache_resource
+def get_detail_cache():
+    return DetailCache()
 
 
 if st.button("Scrape State Jobs", key="scrape_button"):
     jobs = scrape_vacancy_table(VACANCY_URL)
     st.session_state.jobs_data = jobs
+    st.session_state.job_table = JobTable(jobs)
+    st.session_state.filtered_records = None
     if jobs:
+        store.replace_vacancies(jobs)
         st.success(f"Scraped {len(jobs)} jobs successfully!")
 
+# Set while a detail scrape is running; the page reruns once it has drawn
+# everything, the background task list included.
+polling = False
 if st.session_state.jobs_data:
-    counties = sorted(list(set([job['county'] for job in st.session_state.jobs_data])))
-
-    counties_filter = st.multiselect("Filter by County", options=counties, default=[], key="county_filter_main_page")
-    filtered = filter_jobs_by_county(st.session_state.jobs_data, counties_filter)
+    table = st.session_state.job_table
+
+    counties_filter = st.multiselect("Filter by County", options=table.facet_values("county"), default=[], key="county_filter_main_page")
+    col1, col2, col3 = st.columns([2, 1, 1])
+    with col1:
+        agency_filter = st.multiselect("Filter by Agency", options=table.facet_values("agency"), default=[], key="agency_filter_main_page")
+    with col2:
+        grade_filter = st.multiselect("Filter by Salary Grade", options=table.facet_values("salary_grade"), default=[], key="grade_filter_main_page")
+    with col3:
+        deadline_filter = st.multiselect("Filter by Deadline", options=table.facet_values("application_deadline"), default=[], key="deadline_filter_main_page")
+    hide_expired = st.checkbox("Hide postings whose application deadline has passed", value=True, key="hide_expired")
+    rows = table.filter(county=counties_filter, agency=agency_filter, salary_grade=grade_filter, application_deadline=deadline_filter)
+    if hide_expired:
+        rows = table.open_rows(rows)
+
+    # Row dicts are only materialized when the filter actually changed.
+    filter_state = (
+        tuple(counties_filter), tuple(agency_filter), tuple(grade_filter), tuple(deadline_filter),
+        hide_expired and datetime.date.today()
+    )
+    cached = st.session_state.get('filtered_records')
+    if cached is None or cached[0] != filter_state:
+        cached = st.session_state.filtered_records = (filter_state, table.records(rows))
+    filtered = cached[1]
 
     st.session_state.filtered_jobs = filtered
 
-    st.write(f"Total Jobs: {len(st.session_state.jobs_data)}")
-    st.write(f"Filtered Jobs: {len(filtered)}")
+    st.write(f"Total Jobs: {len(table)}")
+    st.write(f"Filtered Jobs: {len(rows)}")
 
-    st.dataframe(filtered)
-
-    if st.button("Scrape Job Details", key="scrape_details_button"):
-        detail_results = {}
-        progress_bar = st.progress(0)
-        total = len(filtered)
-        for i, job in enumerate(filtered):
-            progress_bar.progress(int((i+1)/total*100))
-            item_id = job['item_number']
-            try:
-                detail_data = scrape_job_details(item_id)
-                detail_results[item_id] = detail_data
-            except Exception as e:
-                detail_results[item_id] = {
-                    "item_number": item_id,
-                    "error": str(e)
-                }
+    st.dataframe(table.columns(rows))
 
-        st.session_state.job_details = detail_results
-        st.success("Job details scraped successfully!")
-def save_job_data(filtered_jobs, job_details):
-    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-    filtered_jobs_path = f"filtered_jobs_{timestamp}.json"
-    details_path = f"job_details_{timestamp}.json"
-    with open(filtered_jobs_path, "w", encoding="utf-8") as f:
-        json.dump(filtered_jobs, f, ensure_ascii=False, indent=2)
-    with open(details_path, "w", encoding="utf-8") as f:
-        json.dump(job_details, f, ensure_ascii=False, indent=2)
-    st.success(f"Saved filtered jobs to {filtered_jobs_path} and details to {details_path}")
+    max_workers = st.number_input("Concurrent detail fetches", min_value=1, max_value=32, value=DEFAULT_WORKERS, key="detail_workers")
+    cache_ttl_hours = st.number_input("Reuse cached job details for (hours)", min_value=0.0, value=DEFAULT_TTL / 3600, key="detail_cache_ttl")
+    incremental = st.checkbox("Incremental sync (only fetch new or changed postings)", value=True, key="incremental_sync")
+    skip_expired = st.checkbox(
+        "Skip postings whose application deadline has passed when scraping details", value=True, key="skip_expired"
+    )
 
-
-
-    if st.button("Save Filtered Jobs and Details", key="save_button"):
-        save_job_data(st.session_state.filtered_jobs, st.session_state.job_details)
+    if st.button("Scrape Job Details", key="scrape_details_button"):
+        cache = get_detail_cache()
+        cache.ttl = cache_ttl_hours * 3600
+        all_jobs = st.session_state.jobs_data
+        selected = list(filtered)
+        index = shared_index()
+        # One checkpoint per selection, so concurrent sessions scraping
+        # different filters never share (or discard) each other's progress.
+        selection_key = hashlib.sha256("\n".join(job['item_number'] for job in selected).encode()).hexdigest()[:16]
+        checkpoint = f"details_{selection_key}"
+
+        def sync_task(task):
+            # Runs on a worker thread: report through the task, never st.*.
+            # Each detail is checkpointed as it arrives, so a cancelled or
+            # crashed run resumes from where it stopped instead of starting over.
+            with JsonlSink(checkpoint_path(checkpoint)) as sink:
+                resumed = len(sink.completed)
+                detail_results, fetched, diff = sync_details(
+                    store,
+                    all_jobs,
+                    selected,
+                    cache=cache,
+                    max_workers=int(max_workers),
+                    incremental=incremental,
+                    index=index,
+                    on_done=lambda done, total, item_id: task.progress(done, total),
+                    sink=sink,
+                    skip_expired=skip_expired
+                )
+                sink.discard()
+            return {"details": detail_results, "fetched": len(fetched), "diff": diff, "resumed": resumed}
+
+        # A session scraping the same selection joins the run already going.
+        st.session_state.detail_task = runner.submit(
+            "details", sync_task, owner=session_id, label=f"{len(selected)} job details", key=checkpoint
+        )
+
+    task_id = st.session_state.get('detail_task')
+    status = runner.status(task_id) if task_id else None
+    if status and status["state"] in ("queued", "running"):
+        total = status["total"] or 1
+        st.progress(status["done"] / total, text=f"Scraping job details: {status['done']} of {status['total']} ({status['state']})")
+        if st.button("Cancel", key="cancel_details_button"):
+            runner.cancel(task_id)
+        polling = True
+    elif status:
+        st.session_state.detail_task = None
+        if status["state"] == "done":
+            result = runner.result(task_id)
+            diff = result["diff"]
+            if result["resumed"]:
+                st.info(f"Resumed an interrupted run: {result['resumed']} job details were already fetched.")
+            if diff is not None:
+                st.write(
+                    f"New: {len(diff['new'])}, Changed: {len(diff['changed'])}, "
+                    f"Unchanged: {len(diff['unchanged'])}, Removed: {len(diff['removed'])} "
+                    f"- fetched {result['fetched']} of {len(result['details'])} filtered jobs"
+                )
+            st.session_state.job_details = result["details"]
+            st.success("Job details scraped successfully!")
+        elif status["state"] == "cancelled":
+            st.warning(f"Detail scrape cancelled after {status['done']} of {status['total']} jobs; run it again to resume.")
+        else:
+            st.error(f"Error scraping job details: {status['error']}")
+
+recent = runner.tasks()
+if recent:
+    with st.expander(f"Background tasks ({len(runner.active())} running)"):
+        st.dataframe([
+            {
+                "task": t["id"],
+                "what": t["label"],
+                "state": t["state"],
+                "progress": f"{t['done']}/{t['total']}",
+                "mine": t["owner"] == session_id,
+                "started": time.strftime("%H:%M:%S", time.localtime(t["submitted_at"])),
+                "error": t["error"] or ""
+            }
+            for t in recent
+        ])
+
+if polling:
+    time.sleep(1)
+    st.rerun()
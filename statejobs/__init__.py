@@ -0,0 +1 @@
+# Shared scraping / matching helpers used by the Streamlit pages.
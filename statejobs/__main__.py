@@ -0,0 +1,5 @@
+import sys
+
+from statejobs.cli import main
+
+sys.exit(main())
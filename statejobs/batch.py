@@ -0,0 +1,118 @@
+import asyncio
+import contextlib
+import json
+import os
+import re
+
+from statejobs.matching import JobFeatures, run_matching_async
+from statejobs.resume import analyze_resume, extract_resume_text, resume_id
+from statejobs.taskgraph import PrioritySemaphore
+
+DEFAULT_RESULTS_DIR = "match_results"
+RESUME_EXTENSIONS = (".pdf", ".txt")
+
+
+def find_resumes(directory):
+    return sorted(
+        os.path.join(directory, name)
+        for name in os.listdir(directory)
+        if os.path.splitext(name)[1].lower() in RESUME_EXTENSIONS
+    )
+
+
+def load_candidate(path):
+    with open(path, "rb") as f:
+        data = f.read()
+    text = extract_resume_text(data, os.path.splitext(path)[1].lstrip(".").lower())
+    name = re.sub(r"[^\w.-]+", "_", os.path.splitext(os.path.basename(path))[0])
+    return {"name": name, "path": path, "resume_text": text, "resume_id": resume_id(text)}
+
+
+def load_candidates(paths):
+    # One candidate per distinct resume text; file names that clash after
+    # sanitizing (cv.pdf and cv.txt) get the resume id appended.
+    candidates = []
+    seen_ids = set()
+    names = set()
+    for path in paths:
+        candidate = load_candidate(path)
+        if candidate["resume_id"] in seen_ids:
+            continue
+        if candidate["name"] in names:
+            candidate["name"] = f"{candidate['name']}_{candidate['resume_id'][:8]}"
+        seen_ids.add(candidate["resume_id"])
+        names.add(candidate["name"])
+        candidates.append(candidate)
+    return candidates
+
+
+def results_path(output_dir, candidate):
+    return os.path.join(output_dir, f"{candidate['name']}_matches.json")
+
+
+def write_results(output_dir, candidate, analysis, results, stats):
+    os.makedirs(output_dir, exist_ok=True)
+    path = results_path(output_dir, candidate)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({
+            "candidate": candidate["name"],
+            "resume": candidate["path"],
+            "resume_id": candidate["resume_id"],
+            "candidate_domain": analysis["candidate_domain"],
+            "candidate_salary_range": analysis["candidate_salary_range"],
+            "stats": stats,
+            "results": results
+        }, f, indent=2)
+    os.replace(tmp_path, path)
+    return path
+
+
+async def match_candidates_async(candidates, jobs, output_dir=DEFAULT_RESULTS_DIR, concurrency=8, client=None,
+                                 limiter=None, cache=None, store=None, open_sink=None, semantic_index=None,
+                                 on_done=None, **options):
+    # Matches every candidate against the same jobs (the N x M grid) in one
+    # event loop: job-side work is done once in a shared JobFeatures, and one
+    # semaphore, client, rate limiter and response cache serve every
+    # candidate, so `concurrency` bounds the requests of the whole grid and
+    # the most urgent postings are matched for every candidate first.
+    # Each candidate's results go to its own file (and the store) as soon as
+    # that candidate is done. open_sink(name) may return a JsonlSink to
+    # checkpoint each candidate's results. options are passed on to
+    # run_matching_async. Returns one summary dict per candidate, in order.
+    features = JobFeatures(jobs, options.get("skip_expired", True))
+    semaphore = PrioritySemaphore(concurrency)
+
+    async def match_one(candidate):
+        summary = {"candidate": candidate["name"], "resume_id": candidate["resume_id"]}
+        try:
+            # Ahead of every matching batch, whose priorities start with a
+            # (far salary, deadline ordinal, ...) tuple.
+            async with semaphore.slot((False, 0)):
+                analysis = await asyncio.to_thread(analyze_resume, candidate["resume_text"], cache=cache)
+            sink = open_sink(f"matches_{candidate['resume_id']}") if open_sink else None
+            with sink or contextlib.nullcontext():
+                results, stats = await run_matching_async(
+                    jobs, candidate["resume_text"], analysis["candidate_domain"], analysis["candidate_salary_range"],
+                    concurrency=concurrency, client=client, limiter=limiter, cache=cache,
+                    semantic_index=semantic_index, sink=sink, features=features, semaphore=semaphore, **options
+                )
+                summary["path"] = write_results(output_dir, candidate, analysis, results, stats)
+                if store is not None:
+                    store.upsert_matches(results, candidate["resume_id"])
+                if sink is not None:
+                    sink.discard()
+        except Exception as e:
+            summary["error"] = str(e)
+        else:
+            summary.update(results=results, stats=stats)
+        if on_done:
+            on_done(summary)
+        return summary
+
+    return await asyncio.gather(*(match_one(candidate) for candidate in candidates))
+
+
+def match_candidates(candidates, jobs, **kwargs):
+    # Blocking entry point for scripts and the CLI.
+    return asyncio.run(match_candidates_async(candidates, jobs, **kwargs))
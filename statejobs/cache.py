@@ -0,0 +1,130 @@
+import os
+import sqlite3
+import threading
+import time
+
+import requests
+
+from statejobs.metrics import METRICS
+
+DEFAULT_CACHE_PATH = os.path.join(".cache", "vacancy_details.sqlite3")
+DEFAULT_TTL = 12 * 60 * 60  # seconds a cached page is served without asking the server
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+class DetailCache:
+    # Persistent cache of raw vacancyDetailsPrint.cfm bodies keyed by item_id.
+    # Entries older than ttl are revalidated with ETag / Last-Modified when the
+    # server sent them, and the least recently used pages are evicted once the
+    # stored bodies exceed max_bytes.
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS pages (
+                    item_id TEXT PRIMARY KEY,
+                    body TEXT NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    etag TEXT,
+                    last_modified TEXT,
+                    size INTEGER NOT NULL,
+                    last_access REAL NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_pages_last_access ON pages(last_access)")
+
+    def get(self, item_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, fetched_at, etag, last_modified FROM pages WHERE item_id = ?",
+                (item_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            with self._conn:
+                self._conn.execute("UPDATE pages SET last_access = ? WHERE item_id = ?", (time.time(), item_id))
+        return {
+            "body": row[0],
+            "fetched_at": row[1],
+            "etag": row[2],
+            "last_modified": row[3]
+        }
+
+    def is_fresh(self, entry):
+        return time.time() - entry["fetched_at"] < self.ttl
+
+    def put(self, item_id, body, etag=None, last_modified=None):
+        now = time.time()
+        size = len(body.encode("utf-8"))
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages (item_id, body, fetched_at, etag, last_modified, size, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (item_id, body, now, etag, last_modified, size, now)
+            )
+            self._evict()
+
+    def touch(self, item_id):
+        # Called after a 304: the stored body is still current.
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE pages SET fetched_at = ?, last_access = ? WHERE item_id = ?",
+                (now, now, item_id)
+            )
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        stale = []
+        for item_id, size in self._conn.execute("SELECT item_id, size FROM pages ORDER BY last_access"):
+            if total <= self.max_bytes:
+                break
+            stale.append((item_id,))
+            total -= size
+        self._conn.executemany("DELETE FROM pages WHERE item_id = ?", stale)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def cached_get(url, item_id, session=None, cache=None, timeout=10, revalidate=False):
+    # Returns the page body for url, going to the network only when the cache
+    # has no fresh copy. Stale copies are revalidated with a conditional GET,
+    # and so is a fresh one with revalidate (the caller knows it may be out
+    # of date, e.g. its vacancy row changed).
+    http = session or requests
+    entry = cache.get(item_id) if cache else None
+    if entry and not revalidate and cache.is_fresh(entry):
+        METRICS.count("cache_hits", 1, "fetch")
+        return entry["body"]
+
+    headers = {}
+    if entry:
+        if entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        if entry["last_modified"]:
+            headers["If-Modified-Since"] = entry["last_modified"]
+
+    with METRICS.span("fetch") as span:
+        resp = http.get(url, headers=headers, timeout=timeout)
+        span.count("bytes", len(resp.content))
+        retries = getattr(getattr(resp.raw, "retries", None), "history", ())
+        span.count("retries", len(retries))
+    if entry and resp.status_code == 304:
+        cache.touch(item_id)
+        return entry["body"]
+    resp.raise_for_status()
+    if cache:
+        cache.put(item_id, resp.text, resp.headers.get("ETag"), resp.headers.get("Last-Modified"))
+    return resp.text
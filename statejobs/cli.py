@@ -0,0 +1,306 @@
+import argparse
+import os
+import sys
+import time
+
+import openai
+
+from statejobs.batch import DEFAULT_RESULTS_DIR, find_resumes, load_candidates, match_candidates
+from statejobs.cache import DEFAULT_TTL, DetailCache
+from statejobs.docgen import (
+    COVER_LETTER_TEMPLATE, DEFAULT_OUTPUT_DIR, RESUME_TEMPLATE, InstructionMemo, generate_docs_for_jobs, load_template
+)
+from statejobs.embeddings import EmbeddingIndex
+from statejobs.fetch import DEFAULT_WORKERS
+from statejobs.llm import RateLimiter, UsageMeter
+from statejobs.llm_cache import ResponseCache
+from statejobs.matching import DEFAULT_BATCH_SIZE, DEFAULT_CONCURRENCY, SALARY_MODES, run_matching
+from statejobs.metrics import METRICS
+from statejobs.resume import analyze_resume, extract_resume_text, resume_id
+from statejobs.salary import DEFAULT_TOLERANCE
+from statejobs.scrape import VACANCY_URL, scrape_vacancy_table, stream_sync_details, stream_vacancy_table, sync_details
+from statejobs.sink import DEFAULT_CHECKPOINT_DIR, CheckpointInUse, JsonlSink, checkpoint_path
+from statejobs.store import DEFAULT_DB_PATH, JobStore
+
+# Headless version of the three Streamlit pages: scrape -> details -> match ->
+# documents, for cron and batch runs. Never imports streamlit.
+
+
+def log(message):
+    print(message, file=sys.stderr, flush=True)
+
+
+def open_checkpoint(args, name):
+    path = checkpoint_path(name, args.checkpoint_dir)
+    sink = JsonlSink(path, restart=args.restart)
+    if sink.completed:
+        log(f"Resuming from {path}: {len(sink.completed)} items already done")
+    return sink
+
+
+def add_common_arguments(parser):
+    parser.add_argument("--counties", nargs="+", default=[], help="only keep vacancies in these counties")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="concurrent LLM requests")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="job store database")
+    parser.add_argument("--checkpoint-dir", default=DEFAULT_CHECKPOINT_DIR,
+                        help="where interrupted runs keep their JSONL checkpoints")
+    parser.add_argument("--restart", action="store_true", help="ignore checkpoints of an interrupted run")
+    parser.add_argument("--include-expired", action="store_true",
+                        help="also fetch, match and write documents for postings whose deadline has passed")
+    parser.add_argument("--metrics-dir",
+                        help="record stage timings and write statejobs.prom plus a JSON run summary here")
+
+
+def add_matching_arguments(parser):
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="jobs per matching request")
+    parser.add_argument("--semantic-top-k", type=int, default=0, help="keep only the k jobs most similar to the resume")
+    parser.add_argument("--top-n", type=int, help="send only the N best pre-ranked jobs to the LLM")
+    parser.add_argument("--min-score", type=float, help="send only jobs with at least this pre-rank relevance")
+    parser.add_argument("--salary-mode", choices=SALARY_MODES, default="deprioritize")
+    parser.add_argument("--salary-tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--rpm", type=int, default=500, help="requests per minute limit (0 = unlimited)")
+    parser.add_argument("--tpm", type=int, default=200000, help="tokens per minute limit (0 = unlimited)")
+
+
+def add_run_arguments(parser):
+    parser.add_argument("--resume", required=True, help="resume file (.pdf or .txt)")
+    add_common_arguments(parser)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="concurrent detail fetches")
+    parser.add_argument("--output-dir", default=DEFAULT_OUTPUT_DIR, help="where generated documents are written")
+    parser.add_argument("--no-scrape", action="store_true", help="reuse the stored vacancy table instead of scraping it")
+    parser.add_argument("--buffered-table", action="store_true",
+                        help="download and parse the whole vacancy table before fetching details")
+    parser.add_argument("--full-sync", action="store_true", help="refetch every detail page, not just new or changed ones")
+    parser.add_argument("--cache-ttl", type=float, default=DEFAULT_TTL / 3600, help="hours a cached detail page is reused")
+    add_matching_arguments(parser)
+    parser.add_argument("--levels", nargs="+", choices=("good", "minimum"), default=["good"],
+                        help="match levels to generate documents for")
+    parser.add_argument("--notes", default="", help="notes passed to document generation")
+    parser.add_argument("--no-docs", action="store_true", help="stop after matching")
+    parser.add_argument("--stream", action="store_true",
+                        help="write documents to their files token by token as they are generated")
+    parser.add_argument("--reuse-documents", action="store_true",
+                        help="reuse cached cover letters and resumes for identical requests")
+
+
+def add_batch_arguments(parser):
+    parser.add_argument("--resumes", required=True, help="directory of resumes (.pdf or .txt), one per candidate")
+    add_common_arguments(parser)
+    parser.add_argument("--output-dir", default=DEFAULT_RESULTS_DIR, help="where each candidate's results file is written")
+    add_matching_arguments(parser)
+
+
+def write_metrics(directory):
+    timestamp = time.strftime("%Y%m%d_%H%M%S")
+    METRICS.write_prometheus(os.path.join(directory, "statejobs.prom"))
+    METRICS.write_summary(os.path.join(directory, f"run_{timestamp}.json"))
+    for stage, stats in METRICS.summary()["stages"].items():
+        log(f"{stage:<15} n={stats['count']:<6} p50={stats['p50'] * 1000:8.1f} ms  p95={stats['p95'] * 1000:8.1f} ms")
+
+
+def run(args):
+    start = time.perf_counter()
+    if args.metrics_dir:
+        METRICS.enable()
+        METRICS.reset()
+    store = JobStore(args.db)
+    llm_cache = ResponseCache()
+    try:
+        detail_cache = DetailCache()
+        detail_cache.ttl = args.cache_ttl * 3600
+        index = EmbeddingIndex()
+        sync_options = {
+            "cache": detail_cache, "max_workers": args.workers, "incremental": not args.full_sync, "index": index,
+            "skip_expired": not args.include_expired
+        }
+        try:
+            with open_checkpoint(args, "details") as sink:
+                if args.no_scrape or args.buffered_table:
+                    if args.no_scrape:
+                        all_jobs = store.load_vacancies()
+                        log(f"Loaded {len(all_jobs)} stored vacancies")
+                    else:
+                        try:
+                            all_jobs = scrape_vacancy_table(VACANCY_URL)
+                        except Exception as e:
+                            log(f"Error fetching the vacancy table: {e}")
+                            return 1
+                        store.replace_vacancies(all_jobs)
+                        log(f"Scraped {len(all_jobs)} vacancies")
+                    selected = store.load_vacancies(counties=args.counties)
+                    log(f"{len(selected)} vacancies in {', '.join(args.counties) or 'all counties'}")
+                    details, fetched, diff = sync_details(store, all_jobs, selected, sink=sink, **sync_options)
+                else:
+                    # Detail fetches start as soon as their table row is parsed,
+                    # while the rest of the table is still downloading.
+                    try:
+                        all_jobs, details, fetched, diff = stream_sync_details(
+                            store, stream_vacancy_table(VACANCY_URL), counties=args.counties, sink=sink, **sync_options
+                        )
+                    except Exception as e:
+                        log(f"Error fetching the vacancy table: {e}")
+                        return 1
+                    store.replace_vacancies(all_jobs)
+                    selected = store.load_vacancies(counties=args.counties)
+                    log(f"Scraped {len(all_jobs)} vacancies, {len(selected)} in {', '.join(args.counties) or 'all counties'}")
+                sink.discard()
+        finally:
+            detail_cache.close()
+        log(f"Fetched {len(fetched)} detail pages, reused {len(details) - len(fetched)}")
+
+        with open(args.resume, "rb") as f:
+            resume_bytes = f.read()
+        resume_text = extract_resume_text(resume_bytes, os.path.splitext(args.resume)[1].lstrip(".").lower())
+        analysis = analyze_resume(resume_text, cache=llm_cache)
+        log(f"Candidate domain: {analysis['candidate_domain']}, salary range: {analysis['candidate_salary_range']}")
+
+        with open_checkpoint(args, f"matches_{resume_id(resume_text)}") as sink:
+            results, stats = run_matching(
+                list(details.values()),
+                resume_text,
+                analysis["candidate_domain"],
+                analysis["candidate_salary_range"],
+                batch_size=args.batch_size,
+                concurrency=args.concurrency,
+                # Reads OPENAI_API_KEY and OPENAI_BASE_URL from the environment.
+                client=openai.AsyncOpenAI(max_retries=0),
+                limiter=RateLimiter(args.rpm, args.tpm),
+                cache=llm_cache,
+                top_n=args.top_n,
+                min_score=args.min_score,
+                salary_mode=args.salary_mode,
+                salary_tolerance=args.salary_tolerance,
+                semantic_index=index if args.semantic_top_k else None,
+                semantic_top_k=args.semantic_top_k or None,
+                sink=sink,
+                skip_expired=not args.include_expired
+            )
+            store.upsert_matches(results, resume_id(resume_text))
+            sink.discard()
+        counts = {}
+        for r in results:
+            counts[r['resume_match_level']] = counts.get(r['resume_match_level'], 0) + 1
+        log(
+            f"Matched {len(results)} jobs ({', '.join(f'{n} {level}' for level, n in counts.items())}) "
+            f"with {stats['llm_calls']} LLM calls in {stats['seconds']:.1f} s, "
+            f"{stats['resumed']} resumed from an interrupted run, {stats['expired']} past their deadline"
+        )
+
+        selected_ids = [r['item_number'] for r in results if r['resume_match_level'] in args.levels]
+        if not args.no_docs and selected_ids:
+            cover_letter_template = load_template(COVER_LETTER_TEMPLATE)
+            resume_template = load_template(RESUME_TEMPLATE)
+            if cover_letter_template is None or resume_template is None:
+                log(f"{COVER_LETTER_TEMPLATE} and {RESUME_TEMPLATE} are required to generate documents.")
+                return 1
+            meter = UsageMeter()
+            memo = InstructionMemo()
+            generate_docs_for_jobs(
+                selected_ids, details, {job['item_number']: job.get('agency', '') for job in selected},
+                resume_text, args.notes, cover_letter_template, resume_template, output_dir=args.output_dir,
+                concurrency=args.concurrency, client=openai.AsyncOpenAI(max_retries=0),
+                limiter=RateLimiter(args.rpm, args.tpm), cache=llm_cache, reuse_documents=args.reuse_documents,
+                meter=meter, memo=memo, stream=args.stream, skip_expired=not args.include_expired,
+                on_job_done=lambda item_id, docs: log(
+                    f"Error generating documents for job {item_id}: {docs['error']}" if 'error' in docs
+                    else f"Documents generated for job {item_id}"
+                )
+            )
+            usage = meter.totals()
+            dedup = memo.stats()
+            log(
+                f"Generated documents for {len(selected_ids)} jobs in {args.output_dir}: "
+                f"{usage['calls']} LLM calls, {usage['cache_hits']} local cache hits; "
+                f"instructions dedup ratio {dedup['dedup_ratio']:.0%} "
+                f"({dedup['distinct']} distinct procedures for {dedup['requests']} jobs)"
+            )
+
+        for r in results:
+            if r['resume_match_level'] in args.levels:
+                print(f"{r['item_number']}\t{r['resume_match_level']}\t{r['job_title']}")
+        log(f"Done in {time.perf_counter() - start:.1f} s")
+        return 0
+    finally:
+        llm_cache.close()
+        store.close()
+        if args.metrics_dir:
+            write_metrics(args.metrics_dir)
+
+
+def batch(args):
+    # Matches every resume in a directory against the stored job details
+    # (synced beforehand by `run` or the Streamlit pages), one results file
+    # per candidate.
+    start = time.perf_counter()
+    if args.metrics_dir:
+        METRICS.enable()
+        METRICS.reset()
+    store = JobStore(args.db)
+    llm_cache = ResponseCache()
+    try:
+        candidates = load_candidates(find_resumes(args.resumes))
+        if not candidates:
+            log(f"No .pdf or .txt resumes in {args.resumes}")
+            return 1
+        selected = {job['item_number'] for job in store.load_vacancies(counties=args.counties)}
+        jobs = [job for item_id, job in store.load_details().items() if item_id in selected]
+        if not jobs:
+            log("No stored job details; run `python -m statejobs run` or the Streamlit app to sync them first.")
+            return 1
+        log(f"Matching {len(candidates)} resumes against {len(jobs)} jobs in {', '.join(args.counties) or 'all counties'}")
+
+        summaries = match_candidates(
+            candidates,
+            jobs,
+            output_dir=args.output_dir,
+            concurrency=args.concurrency,
+            # Reads OPENAI_API_KEY and OPENAI_BASE_URL from the environment.
+            client=openai.AsyncOpenAI(max_retries=0),
+            limiter=RateLimiter(args.rpm, args.tpm),
+            cache=llm_cache,
+            store=store,
+            open_sink=lambda name: open_checkpoint(args, name),
+            semantic_index=EmbeddingIndex() if args.semantic_top_k else None,
+            batch_size=args.batch_size,
+            top_n=args.top_n,
+            min_score=args.min_score,
+            salary_mode=args.salary_mode,
+            salary_tolerance=args.salary_tolerance,
+            semantic_top_k=args.semantic_top_k or None,
+            skip_expired=not args.include_expired,
+            on_done=lambda summary: log(
+                f"Error matching {summary['candidate']}: {summary['error']}" if 'error' in summary
+                else f"{summary['candidate']}: {summary['stats']['llm_calls']} LLM calls, "
+                     f"{summary['stats']['resumed']} resumed -> {summary['path']}"
+            )
+        )
+
+        failed = [summary for summary in summaries if 'error' in summary]
+        for summary in summaries:
+            if 'error' not in summary:
+                levels = [r['resume_match_level'] for r in summary['results']]
+                print(f"{summary['candidate']}\t{levels.count('good')} good\t{levels.count('minimum')} minimum\t{summary['path']}")
+        log(f"Matched {len(summaries) - len(failed)} of {len(summaries)} resumes in {time.perf_counter() - start:.1f} s")
+        return 1 if failed else 0
+    finally:
+        llm_cache.close()
+        store.close()
+        if args.metrics_dir:
+            write_metrics(args.metrics_dir)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m statejobs", description="StateJobsNY scraping and resume matching.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    run_parser = subparsers.add_parser("run", help="scrape, match one resume and generate documents")
+    add_run_arguments(run_parser)
+    run_parser.set_defaults(func=run)
+    batch_parser = subparsers.add_parser("batch", help="match a directory of resumes against the stored job details")
+    add_batch_arguments(batch_parser)
+    batch_parser.set_defaults(func=batch)
+    args = parser.parse_args(argv)
+    try:
+        return args.func(args)
+    except CheckpointInUse as e:
+        log(str(e))
+        return 1
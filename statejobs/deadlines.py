@@ -0,0 +1,47 @@
+import datetime
+import functools
+import heapq
+
+# The vacancy table and detail pages write dates as 01/31/25.
+DATE_FORMATS = ("%m/%d/%y", "%m/%d/%Y")
+# Sorts after every real date, so postings without a deadline go last.
+NO_DATE = datetime.date.max.toordinal()
+
+
+@functools.lru_cache(maxsize=4096)
+def parse_date(text):
+    # "01/31/25" -> date(2025, 1, 31); None when empty or unparseable. Cached,
+    # since a table of thousands of rows has only a few hundred distinct dates.
+    text = (text or "").strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.datetime.strptime(text, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def deadline_passed(text, today=None):
+    # Applications are accepted through the deadline day itself.
+    deadline = parse_date(text)
+    return deadline is not None and deadline < (today or datetime.date.today())
+
+
+def is_expired(job, today=None):
+    return deadline_passed(job.get('application_deadline'), today)
+
+
+def deadline_priority(job):
+    # Sort key: soonest deadline first, then the oldest posting; jobs with
+    # unknown dates go last.
+    deadline = parse_date(job.get('application_deadline'))
+    posted = parse_date(job.get('posting_date'))
+    return (deadline.toordinal() if deadline else NO_DATE, posted.toordinal() if posted else NO_DATE)
+
+
+def soonest_first(items, job=lambda item: item):
+    # items in deadline_priority order, drained from a heap; ties keep their
+    # original order. job(item) returns the job dict for an item.
+    heap = [(deadline_priority(job(item)), position, item) for position, item in enumerate(items)]
+    heapq.heapify(heap)
+    return [heapq.heappop(heap)[2] for _ in range(len(heap))]
@@ -0,0 +1,347 @@
+import asyncio
+import datetime
+import hashlib
+import os
+
+from statejobs.deadlines import deadline_priority, is_expired
+from statejobs.llm import acomplete
+from statejobs.metrics import METRICS
+from statejobs.taskgraph import DEFAULT_CONCURRENCY, run_graph
+
+DEFAULT_OUTPUT_DIR = "generated_documents"
+COVER_LETTER_TEMPLATE = "cover_letter_template.txt"
+RESUME_TEMPLATE = "resume_template.txt"
+# The documents generated for each job, in the order they are shown.
+DOCUMENT_KINDS = ("cover_letter", "resume", "changes", "instructions")
+
+
+def load_template(path):
+    # Returns None when the template file is missing so callers can report it.
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def build_template_prompt(doc_type, job_details, agency, resume_text, notes, template):
+    job_title = job_details.get('job_title', '')
+    # Resume, notes, template and instructions come first so they form
+    # a stable prefix across jobs for provider-side prompt caching.
+    return f"""
+You are an expert career services writer. Using the provided template, tailor the {doc_type} specifically for the job described at the end.
+
+Candidate's Original Resume:
+{resume_text}
+
+Notes from Candidate:
+{notes}
+
+Template:
+{template}
+
+Instructions:
+- Incorporate the job title, agency, and relevant experience into the template.
+- Maintain a professional, expert tone.
+- For the resume, highlight the most relevant experience and skills based on the job requirements.
+- Output ONLY the full {doc_type} text with no extra commentary.
+
+Job Details:
+Title: {job_title}
+Agency: {agency}
+Minimum Qualifications: {job_details.get('minimum_qualifications', '')}
+Duties: {job_details.get('duties_description', '')}
+Location: {job_details.get('location', '')}
+Application Procedure: {job_details.get('application_procedure', '')}
+"""
+
+
+def build_instructions_prompt(application_procedure, notes):
+    return f"""
+You are an expert career coach. Provide a clear, step-by-step set of instructions for the candidate to apply to this job based on the application procedure at the end. Be concise, but thorough. If the instructions involve emailing a resume and cover letter, specify subject lines and formats. If a weblink is involved, specify how to navigate there and what to fill out. If forms need to be completed, mention them.
+
+Respond with a numbered list of steps that the candidate should follow to apply.
+
+Notes from Candidate:
+{notes}
+
+Application Procedure:
+{application_procedure}
+"""
+
+
+def build_changes_prompt(original_resume, tailored_resume):
+    return f"""
+You are a professional editor. You have the candidate's original resume and a newly tailored version. Explain in a short paragraph what changes and additions were made in the tailored resume compared to the original, focusing on how it was customized for the specific job.
+
+Original Resume:
+{original_resume}
+
+Tailored Resume:
+{tailored_resume}
+"""
+
+
+async def generate_from_template(doc_type, job_details, agency, resume_text, notes, template, client=None,
+                                 limiter=None, cache=None, reuse_documents=False, meter=None, on_token=None):
+    prompt = build_template_prompt(doc_type, job_details, agency, resume_text, notes, template)
+    text, _ = await acomplete(
+        prompt, max_tokens=2000, temperature=0.7, client=client, limiter=limiter, cache=cache,
+        cache_nondeterministic=reuse_documents, meter=meter, label=f"{doc_type} {job_details.get('item_number', '')}",
+        on_token=on_token
+    )
+    return text
+
+
+def normalize_text(text):
+    # Collapses runs of whitespace and drops blank lines but keeps the line
+    # structure, so boilerplate copied between postings compares equal.
+    return "\n".join(" ".join(line.split()) for line in (text or "").splitlines() if line.strip())
+
+
+def instructions_key(application_procedure, notes):
+    payload = f"{normalize_text(application_procedure)}\0{normalize_text(notes)}"
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class InstructionMemo:
+    # Application instructions depend only on the procedure text and the
+    # notes, and many postings share the same "Notes on Applying"
+    # boilerplate. One memo per generation run makes every distinct
+    # (normalized) procedure cost at most one call, with concurrent requests
+    # awaiting the same future. Because the prompt is built from the
+    # normalized text, the ResponseCache persists the answers across runs.
+
+    def __init__(self):
+        self._futures = {}
+        self.requests = 0
+        self.from_cache = 0
+
+    async def get(self, key, generate):
+        # generate() returns (text, served_from_cache).
+        self.requests += 1
+        if key not in self._futures:
+            self._futures[key] = asyncio.ensure_future(self._run(generate))
+        return await self._futures[key]
+
+    async def _run(self, generate):
+        text, cached = await generate()
+        if cached:
+            self.from_cache += 1
+        return text
+
+    def stats(self):
+        distinct = len(self._futures)
+        return {
+            "requests": self.requests,
+            "distinct": distinct,
+            "from_cache": self.from_cache,
+            "generated": distinct - self.from_cache,
+            "dedup_ratio": 1 - distinct / self.requests if self.requests else 0.0
+        }
+
+
+async def generate_application_instructions(job_details, notes, client=None, limiter=None, cache=None, meter=None,
+                                            memo=None, on_token=None):
+    application_procedure = normalize_text(job_details.get('application_procedure', ''))
+    notes = normalize_text(notes)
+
+    async def generate():
+        text, usage = await acomplete(
+            build_instructions_prompt(application_procedure, notes), max_tokens=1000, temperature=0.0,
+            client=client, limiter=limiter, cache=cache, meter=meter,
+            label=f"instructions {job_details.get('item_number', '')}", on_token=on_token
+        )
+        return text, bool(usage.get("cache_hits"))
+
+    if memo is None:
+        return (await generate())[0]
+    # Only the job that starts a shared call sees its tokens; the others get
+    # the finished text.
+    return await memo.get(instructions_key(application_procedure, notes), generate)
+
+
+async def explain_resume_changes(original_resume, tailored_resume, client=None, limiter=None, cache=None, meter=None,
+                                 on_token=None):
+    text, _ = await acomplete(
+        build_changes_prompt(original_resume, tailored_resume), max_tokens=500, temperature=0.0,
+        client=client, limiter=limiter, cache=cache, meter=meter, label="resume changes", on_token=on_token
+    )
+    return text
+
+
+def document_path(output_dir, item_id, kind, timestamp):
+    return os.path.join(output_dir, f"{item_id}_{kind}_{timestamp}.txt")
+
+
+def write_document(output_dir, item_id, kind, timestamp, text):
+    path = document_path(output_dir, item_id, kind, timestamp)
+    with METRICS.span("write") as span, open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+        span.count("bytes", len(text.encode("utf-8")))
+    return path
+
+
+class StreamingDocument:
+    # A document file written through as tokens arrive. finish() leaves
+    # exactly the final text, the same file write_document() produces;
+    # abort() removes a partial file after a failed call.
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "w", encoding="utf-8")
+
+    def write(self, delta):
+        self._file.write(delta)
+        self._file.flush()
+
+    def finish(self, text):
+        with METRICS.span("write") as span:
+            self._file.seek(0)
+            self._file.write(text)
+            self._file.truncate()
+            self._file.close()
+            span.count("bytes", len(text.encode("utf-8")))
+        return self.path
+
+    def abort(self):
+        self._file.close()
+        os.remove(self.path)
+
+
+def document_tasks(item_id, job_details, agency, resume_text, notes, cover_letter_template, resume_template,
+                   output_dir, timestamp, client=None, limiter=None, cache=None, reuse_documents=False, meter=None,
+                   memo=None, stream=False, on_token=None):
+    # The four LLM calls for one job as run_graph tasks keyed (item_id, kind).
+    # Only the change explanation waits for another call (the tailored
+    # resume); each document is written to output_dir as soon as it is ready,
+    # or, with stream=True, token by token while it is generated.
+    # on_token(item_id, kind, text) sees the streamed deltas.
+    llm = {"client": client, "limiter": limiter, "cache": cache, "meter": meter}
+
+    def token_callback(kind, document=None):
+        if not stream:
+            return None
+
+        def callback(delta):
+            if document is not None:
+                document.write(delta)
+            if on_token:
+                on_token(item_id, kind, delta)
+        return callback
+
+    async def write_through(kind, generate):
+        # generate(token_callback) returns the finished text.
+        if not stream:
+            text = await generate(None)
+            return text, write_document(output_dir, item_id, kind, timestamp, text)
+        document = StreamingDocument(document_path(output_dir, item_id, kind, timestamp))
+        try:
+            text = await generate(token_callback(kind, document))
+        except BaseException:
+            document.abort()
+            raise
+        return text, document.finish(text)
+
+    async def cover_letter():
+        return await write_through("cover_letter", lambda callback: generate_from_template(
+            "cover letter", job_details, agency, resume_text, notes, cover_letter_template,
+            reuse_documents=reuse_documents, on_token=callback, **llm
+        ))
+
+    async def tailored_resume():
+        return await write_through("resume", lambda callback: generate_from_template(
+            "resume", job_details, agency, resume_text, notes, resume_template,
+            reuse_documents=reuse_documents, on_token=callback, **llm
+        ))
+
+    async def changes(resume_result):
+        text = await explain_resume_changes(resume_text, resume_result[0], on_token=token_callback("changes"), **llm)
+        return text, None
+
+    async def instructions():
+        return await write_through("instructions", lambda callback: generate_application_instructions(
+            job_details, notes, memo=memo, on_token=callback, **llm
+        ))
+
+    return {
+        (item_id, "cover_letter"): (cover_letter, ()),
+        (item_id, "resume"): (tailored_resume, ()),
+        (item_id, "changes"): (changes, ((item_id, "resume"),)),
+        (item_id, "instructions"): (instructions, ())
+    }
+
+
+async def generate_docs_for_jobs_async(item_ids, job_details, agencies, resume_text, notes, cover_letter_template,
+                                       resume_template, output_dir=DEFAULT_OUTPUT_DIR, concurrency=DEFAULT_CONCURRENCY,
+                                       client=None, limiter=None, cache=None, reuse_documents=False, meter=None,
+                                       memo=None, stream=False, on_token=None, on_job_done=None, skip_expired=True):
+    # Generates the cover letter, tailored resume, change explanation and
+    # application instructions for every job as one task graph: independent
+    # calls of a job and calls of different jobs run in parallel, at most
+    # `concurrency` at a time. agencies maps item_number to the vacancy
+    # table's agency, used when the detail page did not list one.
+    # on_job_done(item_id, docs) is called as soon as a job's four calls have
+    # settled. Returns {item_id: docs}; docs holds the texts keyed by kind,
+    # their file "paths" and, if a call failed, "error". Jobs with the same
+    # application procedure share one instructions call through memo (pass an
+    # InstructionMemo to read its stats afterwards). stream and on_token are
+    # passed to document_tasks. Calls for the soonest application deadline
+    # run first; with skip_expired, jobs whose deadline has passed get empty
+    # documents and an "error" entry instead of any LLM call, and are settled
+    # once the graph has finished.
+    memo = memo if memo is not None else InstructionMemo()
+    requested = list(dict.fromkeys(item_ids))
+    closed = {}
+    if skip_expired:
+        for item_id in requested:
+            if is_expired(job_details[item_id]):
+                deadline = job_details[item_id]['application_deadline']
+                closed[item_id] = dict.fromkeys(DOCUMENT_KINDS, "")
+                closed[item_id].update(paths={}, error=f"applications closed on {deadline}")
+    item_ids = [item_id for item_id in requested if item_id not in closed]
+    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    os.makedirs(output_dir, exist_ok=True)
+    tasks = {}
+    for item_id in item_ids:
+        details = job_details[item_id]
+        agency = details.get('agency', '') or agencies.get(item_id, '')
+        tasks.update(document_tasks(
+            item_id, details, agency, resume_text, notes, cover_letter_template, resume_template, output_dir,
+            timestamp, client=client, limiter=limiter, cache=cache, reuse_documents=reuse_documents, meter=meter,
+            memo=memo, stream=stream, on_token=on_token
+        ))
+
+    generated = {item_id: {"paths": {}} for item_id in item_ids}
+    outstanding = {item_id: 0 for item_id in item_ids}
+    for item_id, _ in tasks:
+        outstanding[item_id] += 1
+
+    def settle(key, result):
+        item_id, kind = key
+        docs = generated[item_id]
+        if isinstance(result, Exception):
+            docs[kind] = ""
+            docs.setdefault("error", f"{kind}: {result}")
+        else:
+            docs[kind], path = result
+            if path:
+                docs["paths"][kind] = path
+        outstanding[item_id] -= 1
+        if not outstanding[item_id] and on_job_done:
+            on_job_done(item_id, docs)
+
+    await run_graph(
+        tasks, concurrency=concurrency, on_done=settle, priority=lambda key: deadline_priority(job_details[key[0]])
+    )
+    for item_id, docs in closed.items():
+        if on_job_done:
+            on_job_done(item_id, docs)
+    return {item_id: closed.get(item_id) or generated[item_id] for item_id in requested}
+
+
+def generate_docs_for_jobs(item_ids, job_details, agencies, resume_text, notes, cover_letter_template, resume_template,
+                           **kwargs):
+    # Blocking entry point for Streamlit buttons and scripts.
+    return asyncio.run(generate_docs_for_jobs_async(
+        item_ids, job_details, agencies, resume_text, notes, cover_letter_template, resume_template, **kwargs
+    ))
@@ -0,0 +1,213 @@
+import hashlib
+import json
+import os
+import threading
+
+import numpy as np
+
+from statejobs.prerank import tokenize
+
+DEFAULT_INDEX_DIR = os.path.join(".cache", "embeddings")
+DEFAULT_DIM = 256
+DEFAULT_OPENAI_MODEL = "text-embedding-3-small"
+OPENAI_BATCH = 256
+
+
+def job_text(job):
+    return "\n".join([
+        job.get('job_title', ''),
+        job.get('duties_description', ''),
+        job.get('minimum_qualifications', '')
+    ])
+
+
+def normalize_rows(vectors):
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (vectors / norms).astype(np.float32)
+
+
+class HashingEmbedder:
+    # Deterministic feature-hashing embedder: no network, no model download,
+    # same vectors on every machine. Good enough to rank postings by shared
+    # vocabulary and the default for offline runs and tests.
+
+    def __init__(self, dim=DEFAULT_DIM):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def _bucket(self, token):
+        digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+        value = int.from_bytes(digest, "little")
+        return value % self.dim, 1.0 if value >> 63 else -1.0
+
+    def embed(self, texts):
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            tokens = tokenize(text)
+            # Unigrams plus bigrams so "data engineer" differs from "engineer data".
+            features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+            for feature in features:
+                column, sign = self._bucket(feature)
+                vectors[row, column] += sign
+        # Sub-linear term frequency, then unit length for cosine similarity.
+        vectors = np.sign(vectors) * np.log1p(np.abs(vectors))
+        return normalize_rows(vectors)
+
+
+class OpenAIEmbedder:
+    def __init__(self, model=DEFAULT_OPENAI_MODEL, client=None, dim=None):
+        self.model = model
+        self.client = client
+        self.dim = dim or (3072 if model.endswith("large") else 1536)
+        self.name = f"openai-{model}-{self.dim}"
+
+    def embed(self, texts):
+        import openai
+
+        client = self.client or openai
+        rows = []
+        for start in range(0, len(texts), OPENAI_BATCH):
+            chunk = [text or " " for text in texts[start:start + OPENAI_BATCH]]
+            response = client.embeddings.create(model=self.model, input=chunk)
+            rows.extend(item.embedding for item in sorted(response.data, key=lambda item: item.index))
+        return normalize_rows(np.array(rows, dtype=np.float32).reshape(len(texts), self.dim))
+
+
+def make_embedder(name=None):
+    # STATEJOBS_EMBEDDER=openai switches to OpenAI embeddings; the default is
+    # the offline hashing embedder.
+    name = name or os.getenv("STATEJOBS_EMBEDDER", "hashing")
+    if name == "openai":
+        return OpenAIEmbedder()
+    return HashingEmbedder()
+
+
+class EmbeddingIndex:
+    # Job vectors in a float32 .npy file opened with np.memmap, plus a small
+    # JSON manifest mapping rows to item_numbers. The file grows by doubling
+    # its capacity, so adding a handful of new vacancies does not rewrite it,
+    # and a posting whose text changed is re-embedded in place.
+
+    def __init__(self, directory=DEFAULT_INDEX_DIR, embedder=None):
+        self.directory = directory
+        self.embedder = embedder or make_embedder()
+        self.vectors_path = os.path.join(directory, "vectors.npy")
+        self.manifest_path = os.path.join(directory, "manifest.json")
+        os.makedirs(directory, exist_ok=True)
+        self.ids = []
+        self.text_hashes = []
+        self.row_of = {}
+        self.vectors = None
+        # One index is shared by every session and the background workers.
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not (os.path.exists(self.manifest_path) and os.path.exists(self.vectors_path)):
+            return
+        with open(self.manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("embedder") != self.embedder.name:
+            # Vectors from another embedder are not comparable; start over.
+            return
+        self.ids = manifest["ids"]
+        self.text_hashes = manifest["text_hashes"]
+        self.row_of = {item_id: row for row, item_id in enumerate(self.ids)}
+        self.vectors = np.load(self.vectors_path, mmap_mode="r+")
+
+    def _save_manifest(self):
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"embedder": self.embedder.name, "ids": self.ids, "text_hashes": self.text_hashes}, f)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _ensure_capacity(self, rows):
+        capacity = 0 if self.vectors is None else self.vectors.shape[0]
+        if rows <= capacity:
+            return
+        new_capacity = max(rows, capacity * 2, 1024)
+        tmp_path = f"{self.vectors_path}.tmp"
+        grown = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.float32, shape=(new_capacity, self.embedder.dim))
+        if self.vectors is not None and self.ids:
+            grown[:len(self.ids)] = self.vectors[:len(self.ids)]
+        grown.flush()
+        del grown
+        self.vectors = None
+        os.replace(tmp_path, self.vectors_path)
+        self.vectors = np.load(self.vectors_path, mmap_mode="r+")
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, item_id):
+        return item_id in self.row_of
+
+    def add(self, jobs):
+        # Embeds jobs that are new or whose text changed; returns how many.
+        with self._lock:
+            pending = []
+            for job in jobs:
+                if 'error' in job:
+                    continue
+                text = job_text(job)
+                text_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+                row = self.row_of.get(job['item_number'])
+                if row is None or self.text_hashes[row] != text_hash:
+                    pending.append((job['item_number'], text, text_hash))
+            if not pending:
+                return 0
+
+            vectors = self.embedder.embed([text for _, text, _ in pending])
+            self._ensure_capacity(len(self.ids) + len(pending))
+            for (item_id, _, text_hash), vector in zip(pending, vectors):
+                row = self.row_of.get(item_id)
+                if row is None:
+                    row = len(self.ids)
+                    self.ids.append(item_id)
+                    self.text_hashes.append(text_hash)
+                    self.row_of[item_id] = row
+                else:
+                    self.text_hashes[row] = text_hash
+                self.vectors[row] = vector
+            self.vectors.flush()
+            self._save_manifest()
+            return len(pending)
+
+    def rank(self, query_text, k=None, item_numbers=None):
+        # Cosine similarity of every indexed job to the query in one
+        # matrix-vector product, then top-k selection with argpartition.
+        # Returns [(item_number, score), ...] best first.
+        with self._lock:
+            if not self.ids:
+                return []
+            query = self.embedder.embed([query_text])[0]
+            scores = np.asarray(self.vectors[:len(self.ids)] @ query)
+            if item_numbers is not None:
+                rows = np.array([self.row_of[i] for i in item_numbers if i in self.row_of], dtype=np.int64)
+            else:
+                rows = np.arange(len(self.ids))
+            if not len(rows):
+                return []
+            candidate_scores = scores[rows]
+            if k is not None and k < len(rows):
+                top = np.argpartition(-candidate_scores, k - 1)[:k]
+                top = top[np.argsort(-candidate_scores[top], kind="stable")]
+            else:
+                top = np.argsort(-candidate_scores, kind="stable")
+            return [(self.ids[rows[i]], float(candidate_scores[i])) for i in top]
+
+
+_shared = {}
+_shared_lock = threading.Lock()
+
+
+def shared_index(directory=DEFAULT_INDEX_DIR):
+    # One index per directory and process, like worker.shared_runner(): two
+    # instances on the same files would each append from their own manifest
+    # and overwrite the other's rows.
+    path = os.path.abspath(directory)
+    with _shared_lock:
+        if path not in _shared:
+            _shared[path] = EmbeddingIndex(directory)
+        return _shared[path]
@@ -0,0 +1,144 @@
+import heapq
+import itertools
+import queue
+import threading
+import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+DEFAULT_WORKERS = 8
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 0.5
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+def make_session(pool_size=DEFAULT_WORKERS, retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF):
+    # One pooled session is shared by every worker thread. pool_maxsize is per
+    # host and pool_block=True makes extra threads wait for a free connection,
+    # so statejobs.ny.gov never sees more than pool_size open sockets from us.
+    retry = Retry(
+        total=retries,
+        connect=retries,
+        read=retries,
+        status=retries,
+        backoff_factor=backoff,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset(["GET", "HEAD"]),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, pool_block=True, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def _result(future, item_id):
+    try:
+        return future.result()
+    except Exception as e:
+        return {
+            "item_number": item_id,
+            "error": str(e)
+        }
+
+
+def fetch_all(item_ids, fetch_one, max_workers=DEFAULT_WORKERS, on_done=None):
+    # Runs fetch_one(item_id) for every id on a bounded thread pool.
+    # on_done(done_count, total, item_id) is called from the calling thread as
+    # each fetch finishes, in completion order. Failures are stored as
+    # {"item_number": ..., "error": ...} entries like the sequential loop did.
+    item_ids = list(dict.fromkeys(item_ids))
+    total = len(item_ids)
+    results = {}
+    if not total:
+        return results
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, total))) as pool:
+        futures = {pool.submit(fetch_one, item_id): item_id for item_id in item_ids}
+        try:
+            for done, future in enumerate(as_completed(futures), start=1):
+                item_id = futures[future]
+                results[item_id] = _result(future, item_id)
+                if on_done:
+                    on_done(done, total, item_id)
+        except BaseException:
+            # on_done may abort the run (e.g. a cancelled background task);
+            # drop the fetches that have not started yet.
+            for future in futures:
+                future.cancel()
+            raise
+
+    # Keep the dict in table order so downstream pages see the same layout.
+    return {item_id: results[item_id] for item_id in item_ids}
+
+
+def fetch_iter(item_ids, fetch_one, max_workers=DEFAULT_WORKERS, on_done=None, priority=None):
+    # fetch_all for ids that are still being produced, e.g. rows of a table
+    # that is still downloading: each fetch starts as soon as its id arrives
+    # and a worker is free, instead of after the last id. Waiting ids are
+    # kept in a heap ordered by priority(item_id) (arrival order without
+    # one), so an urgent id that arrives late still overtakes queued ones.
+    # A finishing fetch starts the next waiting id from its own thread, so
+    # workers stay busy while item_ids blocks on the download. on_done runs
+    # on the calling thread, as in fetch_all; the total passed to it is the
+    # number of ids seen so far. Results are in the order the ids arrived.
+    workers = max(1, max_workers)
+    seen = {}
+    results = {}
+    queued = []
+    arrival = itertools.count()
+    running = set()
+    stopped = False
+    lock = threading.Lock()
+    finished = queue.SimpleQueue()
+
+    def start(pool):
+        # Fills free workers from the heap; called by the producer and by
+        # every finished fetch.
+        while True:
+            with lock:
+                if stopped or not queued or len(running) >= workers:
+                    return
+                item_id = heapq.heappop(queued)[2]
+                future = pool.submit(fetch_one, item_id)
+                running.add(future)
+            future.add_done_callback(lambda future, item_id=item_id: finish(pool, future, item_id))
+
+    def finish(pool, future, item_id):
+        with lock:
+            running.discard(future)
+        finished.put((future, item_id))
+        start(pool)
+
+    def collect(block):
+        while len(results) < len(seen):
+            try:
+                future, item_id = finished.get(block=block)
+            except queue.Empty:
+                return
+            results[item_id] = _result(future, item_id)
+            if on_done:
+                on_done(len(results), len(seen), item_id)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        try:
+            for item_id in item_ids:
+                if item_id in seen:
+                    continue
+                seen[item_id] = None
+                with lock:
+                    heapq.heappush(queued, (priority(item_id) if priority else 0, next(arrival), item_id))
+                start(pool)
+                collect(block=False)
+            collect(block=True)
+        except BaseException:
+            with lock:
+                stopped = True
+                for future in running:
+                    future.cancel()
+            raise
+
+    return {item_id: results[item_id] for item_id in seen}
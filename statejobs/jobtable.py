@@ -0,0 +1,122 @@
+import datetime
+from collections import OrderedDict
+
+import numpy as np
+
+from statejobs.deadlines import deadline_passed, parse_date
+from statejobs.store import VACANCY_FIELDS
+
+# Columns that get an inverted index and can be filtered on.
+FACETS = ("county", "agency", "salary_grade", "application_deadline")
+# MM/DD/YY columns, whose options are listed in date order.
+DATE_FIELDS = ("posting_date", "application_deadline")
+DEFAULT_CACHE_SIZE = 64
+
+
+def factorize(values):
+    # (sorted distinct values, int32 codes); a dict pass is several times
+    # faster than np.unique on Python strings.
+    positions = {}
+    codes = np.fromiter((positions.setdefault(value, len(positions)) for value in values), dtype=np.int32,
+                        count=len(values))
+    categories = np.array(list(positions), dtype=object)
+    order = np.argsort(categories.astype(str), kind="stable")
+    remap = np.empty(len(order), dtype=np.int32)
+    remap[order] = np.arange(len(order), dtype=np.int32)
+    return categories[order], remap[codes]
+
+
+class JobTable:
+    # Read-only columnar copy of the vacancy table. Every field is a
+    # categorical column: int32 codes into the sorted distinct values, so
+    # facet option lists are precomputed and filtering never touches the row
+    # dicts. Each facet also has an inverted index (value -> row ids); a
+    # filter ORs the postings of the selected values into a boolean mask per
+    # facet and ANDs the facets together. Results are cached per filter state,
+    # so a Streamlit rerun with unchanged widgets does no work. Rows keep the
+    # vacancy table's order.
+
+    def __init__(self, jobs, cache_size=DEFAULT_CACHE_SIZE):
+        self.size = len(jobs)
+        self.categories = {}
+        self.codes = {}
+        for field in VACANCY_FIELDS:
+            self.categories[field], self.codes[field] = factorize([job.get(field, '') or '' for job in jobs])
+
+        self.index = {}
+        for facet in FACETS:
+            codes = self.codes[facet]
+            order = np.argsort(codes, kind="stable").astype(np.int32)
+            counts = np.bincount(codes, minlength=len(self.categories[facet]))
+            postings = np.split(order, np.cumsum(counts)[:-1]) if len(counts) else []
+            self.index[facet] = dict(zip(self.categories[facet], postings))
+
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+
+    def __len__(self):
+        return self.size
+
+    def facet_values(self, facet):
+        # Sorted as strings, except dates: chronologically, unparseable last.
+        values = list(self.categories[facet])
+        if facet in DATE_FIELDS:
+            values.sort(key=lambda value: (parse_date(value) is None, parse_date(value) or datetime.date.min))
+        return values
+
+    def facet_counts(self, facet):
+        return {value: len(rows) for value, rows in self.index[facet].items()}
+
+    def filter(self, **selected):
+        # filter(county=[...], agency=[...]) -> ascending row ids. A facet
+        # with no selected values does not restrict the result.
+        for facet in selected:
+            if facet not in self.index:
+                raise ValueError(f"Unknown facet {facet!r}; expected one of {FACETS}")
+        key = tuple(
+            (facet, tuple(sorted(set(values))))
+            for facet, values in sorted(selected.items())
+            if values
+        )
+        rows = self._cache.get(key)
+        if rows is not None:
+            self._cache.move_to_end(key)
+            return rows
+        rows = self._select(key)
+        rows.setflags(write=False)  # shared by every caller with this filter state
+        self._cache[key] = rows
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return rows
+
+    def _select(self, key):
+        mask = None
+        for facet, values in key:
+            facet_mask = np.zeros(self.size, dtype=bool)
+            for value in values:
+                rows = self.index[facet].get(value)
+                if rows is not None:
+                    facet_mask[rows] = True
+            mask = facet_mask if mask is None else mask & facet_mask
+        if mask is None:
+            return np.arange(self.size, dtype=np.int32)
+        return np.flatnonzero(mask).astype(np.int32)
+
+    def open_rows(self, rows, today=None):
+        # rows whose application deadline has not passed: one date parse per
+        # distinct deadline, then a lookup through the codes.
+        deadlines = self.categories["application_deadline"]
+        closed = np.fromiter((deadline_passed(value, today) for value in deadlines), dtype=bool, count=len(deadlines))
+        return rows[~closed[self.codes["application_deadline"][rows]]]
+
+    def columns(self, rows=None):
+        # {field: list of values} for rows, the shape st.dataframe renders
+        # without building a dict per row.
+        if rows is None:
+            rows = np.arange(self.size)
+        return {field: self.categories[field][self.codes[field][rows]].tolist() for field in VACANCY_FIELDS}
+
+    def records(self, rows=None):
+        # The selected rows as the job dicts the rest of the app works with.
+        columns = self.columns(rows)
+        return [dict(zip(VACANCY_FIELDS, values)) for values in zip(*(columns[field] for field in VACANCY_FIELDS))]
@@ -0,0 +1,264 @@
+import asyncio
+import json
+import random
+import threading
+import time
+
+import openai
+
+from statejobs.llm_cache import request_key
+from statejobs.metrics import METRICS
+
+DEFAULT_MODEL = "gpt-4o-mini"
+DEFAULT_MAX_RETRIES = 4
+DEFAULT_BACKOFF = 1.0
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+def usage_counts(completion):
+    usage = getattr(completion, "usage", None)
+    details = getattr(usage, "prompt_tokens_details", None)
+    return {
+        "prompt_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+        "completion_tokens": getattr(usage, "completion_tokens", 0) or 0,
+        # Prompt tokens the provider served from its prompt cache.
+        "cached_tokens": getattr(details, "cached_tokens", 0) or 0
+    }
+
+
+class UsageMeter:
+    # Per-call token accounting for one run (a matching run, a document
+    # generation run, ...). Thread-safe so concurrent calls can share it.
+
+    def __init__(self):
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def record(self, label, usage):
+        with self._lock:
+            self.calls.append(dict(usage, label=label))
+
+    def totals(self):
+        with self._lock:
+            calls = list(self.calls)
+        totals = {"calls": len(calls), "prompt_tokens": 0, "completion_tokens": 0, "cached_tokens": 0, "cache_hits": 0}
+        for call in calls:
+            for key in ("prompt_tokens", "completion_tokens", "cached_tokens", "cache_hits"):
+                totals[key] += call.get(key, 0)
+        return totals
+
+
+def count_tokens(usage):
+    for key in ("prompt_tokens", "completion_tokens", "cached_tokens"):
+        METRICS.count(key, usage.get(key, 0), "llm")
+
+
+def estimate_tokens(text):
+    # Rough 4-characters-per-token estimate, only used for rate limiting.
+    return len(text) // 4 + 1
+
+
+def is_valid(text, validate):
+    # validate(text) raises ValueError (json.JSONDecodeError included) for a
+    # reply the caller cannot use; such replies are never cached.
+    if validate is None:
+        return True
+    try:
+        validate(text)
+    except ValueError:
+        return False
+    return True
+
+
+def json_object(text):
+    # validate callable for prompts that ask for a single JSON object.
+    if not isinstance(json.loads(text), dict):
+        raise ValueError("reply is not a JSON object")
+
+
+def cache_lookup(cache, prompt, max_tokens, temperature, model, cache_nondeterministic=False, validate=None):
+    # Only deterministic (temperature 0.0) calls are served from the cache
+    # unless the caller opts in. Returns (key, hit) where hit is
+    # (text, usage) or None; key is None when the call must not be cached.
+    # A stored reply that fails validate counts as a miss and is replaced.
+    if cache is None or (temperature != 0.0 and not cache_nondeterministic):
+        return None, None
+    key = request_key(model, [{"role": "system", "content": prompt}], temperature, max_tokens)
+    hit = cache.get(key)
+    if hit is None or not is_valid(hit[0], validate):
+        return key, None
+    # A cache hit costs no tokens.
+    METRICS.count("cache_hits", 1, "llm")
+    return key, (hit[0], {"prompt_tokens": 0, "completion_tokens": 0, "cached_tokens": 0, "cache_hits": 1})
+
+
+def complete(prompt, max_tokens, temperature, model=DEFAULT_MODEL, client=None, cache=None,
+             cache_nondeterministic=False, meter=None, label="", validate=None):
+    # Single system-prompt chat completion, the shape every call in the app
+    # uses. client defaults to the module-level openai client configured by
+    # the pages; pass an openai.OpenAI(...) instance to target another server.
+    # Replies that fail validate (see is_valid) are returned but not cached.
+    key, hit = cache_lookup(cache, prompt, max_tokens, temperature, model, cache_nondeterministic, validate)
+    if hit:
+        if meter:
+            meter.record(label, hit[1])
+        return hit
+    client = client or openai
+    with METRICS.span("llm"):
+        completion = client.chat.completions.create(
+            model=model,
+            messages=[{"role": "system", "content": prompt}],
+            max_tokens=max_tokens,
+            temperature=temperature
+        )
+    text, usage = completion.choices[0].message.content.strip(), usage_counts(completion)
+    count_tokens(usage)
+    if key and is_valid(text, validate):
+        cache.put(key, text, usage)
+    if meter:
+        meter.record(label, usage)
+    return text, usage
+
+
+class RateLimiter:
+    # Client-side token buckets for requests per minute and tokens per minute.
+    # Either limit may be None/0 for unlimited. Shared by every coroutine of
+    # a run, so concurrency never pushes us past the account's limits.
+
+    def __init__(self, requests_per_minute=None, tokens_per_minute=None):
+        self.requests_per_minute = requests_per_minute or None
+        self.tokens_per_minute = tokens_per_minute or None
+        self._requests = float(self.requests_per_minute or 0)
+        self._tokens = float(self.tokens_per_minute or 0)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self._updated = now
+        if self.requests_per_minute:
+            self._requests = min(self.requests_per_minute, self._requests + elapsed * self.requests_per_minute / 60)
+        if self.tokens_per_minute:
+            self._tokens = min(self.tokens_per_minute, self._tokens + elapsed * self.tokens_per_minute / 60)
+
+    async def acquire(self, tokens):
+        if self.tokens_per_minute:
+            # A single request larger than the bucket would otherwise wait forever.
+            tokens = min(tokens, self.tokens_per_minute)
+        async with self._lock:
+            while True:
+                self._refill()
+                wait = 0.0
+                if self.requests_per_minute and self._requests < 1:
+                    wait = max(wait, (1 - self._requests) * 60 / self.requests_per_minute)
+                if self.tokens_per_minute and self._tokens < tokens:
+                    wait = max(wait, (tokens - self._tokens) * 60 / self.tokens_per_minute)
+                if wait <= 0:
+                    break
+                await asyncio.sleep(wait)
+            if self.requests_per_minute:
+                self._requests -= 1
+            if self.tokens_per_minute:
+                self._tokens -= tokens
+
+
+def is_retryable(error):
+    if isinstance(error, (openai.APIConnectionError, openai.APITimeoutError)):
+        return True
+    return getattr(error, "status_code", None) in RETRY_STATUSES
+
+
+def retry_delay(error, attempt, backoff=DEFAULT_BACKOFF):
+    response = getattr(error, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    try:
+        return max(float(retry_after), 0.0)
+    except (TypeError, ValueError):
+        # Exponential backoff with jitter so concurrent retries spread out.
+        return backoff * (2 ** attempt) + random.uniform(0, backoff)
+
+
+async def stream_completion(client, prompt, max_tokens, temperature, model, on_token):
+    # Streams a chat completion from an openai.AsyncOpenAI client, calling
+    # on_token(text) for every content delta as it arrives.
+    stream = await client.chat.completions.create(
+        model=model,
+        messages=[{"role": "system", "content": prompt}],
+        max_tokens=max_tokens,
+        temperature=temperature,
+        stream=True,
+        stream_options={"include_usage": True}
+    )
+    parts = []
+    usage = usage_counts(None)
+    async for chunk in stream:
+        if getattr(chunk, "usage", None):
+            usage = usage_counts(chunk)
+        for choice in chunk.choices:
+            delta = choice.delta.content
+            if delta:
+                parts.append(delta)
+                on_token(delta)
+    return "".join(parts).strip(), usage
+
+
+async def acomplete(prompt, max_tokens, temperature, model=DEFAULT_MODEL, client=None, limiter=None,
+                    max_retries=DEFAULT_MAX_RETRIES, backoff=DEFAULT_BACKOFF, cache=None,
+                    cache_nondeterministic=False, meter=None, label="", on_token=None, validate=None):
+    # Async counterpart of complete() with rate limiting and retry/backoff on
+    # 429, 5xx and connection errors. Works with openai.AsyncOpenAI clients
+    # natively and runs sync clients (including the openai module) in a thread.
+    # With on_token the completion is streamed and on_token(text) receives
+    # each delta (cache hits and sync clients deliver the whole text at once);
+    # a stream that fails after its first token is not retried. validate is
+    # applied as in complete().
+    key, hit = cache_lookup(cache, prompt, max_tokens, temperature, model, cache_nondeterministic, validate)
+    if hit:
+        if meter:
+            meter.record(label, hit[1])
+        if on_token:
+            on_token(hit[0])
+        return hit
+    client = client or openai
+    streamed = []
+
+    def emit(delta):
+        streamed.append(delta)
+        on_token(delta)
+
+    attempt = 0
+    while True:
+        if limiter:
+            with METRICS.span("llm_wait"):
+                await limiter.acquire(estimate_tokens(prompt) + max_tokens)
+        try:
+            if isinstance(client, openai.AsyncOpenAI):
+                with METRICS.span("llm"):
+                    if on_token:
+                        text, usage = await stream_completion(client, prompt, max_tokens, temperature, model, emit)
+                    else:
+                        completion = await client.chat.completions.create(
+                            model=model,
+                            messages=[{"role": "system", "content": prompt}],
+                            max_tokens=max_tokens,
+                            temperature=temperature
+                        )
+                        text, usage = completion.choices[0].message.content.strip(), usage_counts(completion)
+                count_tokens(usage)
+            else:
+                text, usage = await asyncio.to_thread(complete, prompt, max_tokens, temperature, model, client)
+                if on_token:
+                    on_token(text)
+            break
+        except Exception as e:
+            if streamed or attempt >= max_retries or not is_retryable(e):
+                raise
+            METRICS.count("retries", 1, "llm")
+            await asyncio.sleep(retry_delay(e, attempt, backoff))
+            attempt += 1
+    if key and is_valid(text, validate):
+        cache.put(key, text, usage)
+    if meter:
+        meter.record(label, usage)
+    return text, usage
@@ -0,0 +1,417 @@
+import asyncio
+import hashlib
+import json
+import time
+
+import numpy as np
+
+from statejobs.deadlines import deadline_priority, is_expired, soonest_first
+from statejobs.llm import UsageMeter, acomplete, json_object
+from statejobs.prerank import TermIndex, prerank, pruned_explanation
+from statejobs.salary import DEFAULT_TOLERANCE, describe_gap, parse_salary, relative_gaps, salary_arrays, salary_gaps
+from statejobs.taskgraph import PrioritySemaphore
+
+MATCH_LEVELS = ("good", "minimum", "no match")
+DEFAULT_BATCH_SIZE = 1
+DEFAULT_CONCURRENCY = 8
+# What to do with jobs whose salary is far outside the candidate's range.
+SALARY_MODES = ("off", "deprioritize", "skip")
+MAX_TOKENS_PER_JOB = 300
+# Explanations of results where the LLM call or its reply failed.
+EVALUATION_ERROR = "Error during evaluation"
+# Checkpointed verdicts carry the verdict_fingerprint of what the LLM was
+# shown, so a changed posting or resume analysis is evaluated again.
+FINGERPRINT_KEY = "_fingerprint"
+
+# Good match: meets min qual, domain aligns, salary close
+# Minimum: meets min qual but not domain or salary not aligned
+# No match: does not meet min qual
+CRITERIA = """Criteria:
+- The candidate must meet the minimum qualifications for the job to be at least "minimum".
+- The candidate's domain should align with the job's domain to be considered "good".
+- The job’s salary range should be reasonably close to the candidate’s current salary range for a "good" match.
+- If the candidate meets minimum qualifications but domain or salary are not well aligned, then "minimum".
+- If the candidate does not meet minimum qualifications, then "no match".
+- If the candidate meets minimum qualifications and both domain alignment and salary proximity are good, then "good"."""
+
+
+def match_result(job, level, explanation):
+    return {
+        "item_number": job['item_number'],
+        "job_title": job.get('job_title', ''),
+        "resume_match_level": level,
+        "match_explanation": explanation
+    }
+
+
+def precheck(job, skip_expired=True):
+    # Jobs that can be classified without asking the LLM.
+    if 'error' in job:
+        return match_result(job, "no match", "Job details could not be retrieved.")
+    if skip_expired and is_expired(job):
+        return match_result(
+            job, "no match", f"Skipped before LLM evaluation: applications closed on {job['application_deadline']}."
+        )
+    if not job.get("minimum_qualifications", "").strip():
+        return match_result(job, "no match", "No minimum qualifications listed.")
+    return None
+
+
+class JobFeatures:
+    # The candidate-independent part of matching for one job list: precheck
+    # verdicts, parsed salaries and the pre-ranking term index. Built once and
+    # passed to run_matching_async for every resume matched against the same
+    # jobs, so local work grows with jobs + resumes, not jobs x resumes.
+
+    def __init__(self, jobs, skip_expired=True):
+        self.jobs = jobs
+        self.skip_expired = skip_expired
+        self.prechecks = [precheck(job, skip_expired) for job in jobs]
+        self.mins, self.maxs = salary_arrays(jobs)
+        self.term_index = TermIndex(jobs)
+        self._embedded_in = []
+
+    def __len__(self):
+        return len(self.jobs)
+
+    def embed(self, semantic_index):
+        # Adds the jobs to a semantic index once per index.
+        if not any(index is semantic_index for index in self._embedded_in):
+            semantic_index.add(self.jobs)
+            self._embedded_in.append(semantic_index)
+
+
+def job_block(job):
+    salary_gap = f"\nSalary Gap: {job['salary_gap']}" if job.get('salary_gap') else ""
+    return f"""Title: {job.get('job_title', '')}
+Salary Range: {job.get('salary_range', '')}{salary_gap}
+Minimum Qualifications: {job.get('minimum_qualifications', '').strip()}
+Duties: {job.get('duties_description', '')}
+Agency: {job.get('agency', '')}"""
+
+
+def build_matching_prefix(resume_text, candidate_domain, candidate_salary_range):
+    # Everything that is the same for every job of a run, so it forms a
+    # byte-identical prompt prefix that provider-side prompt caching can
+    # reuse across the hundreds of per-job (and batched) calls.
+    return f"""
+You are a professional career advisor. You will classify how well this candidate matches one or more jobs.
+
+{CRITERIA}
+
+DO NOT include triple backticks or code fences.
+
+Candidate Domain: {candidate_domain}
+Candidate Current Salary Range: {candidate_salary_range}
+
+The candidate's resume:
+{resume_text}
+"""
+
+
+def build_matching_prompt(job, resume_text, candidate_domain, candidate_salary_range, prefix=None):
+    prefix = prefix or build_matching_prefix(resume_text, candidate_domain, candidate_salary_range)
+    return f"""{prefix}
+Only return a pure JSON object. 
+Your response MUST be a valid JSON object and must have the following structure:
+{{
+  "resume_match_level": "minimum" | "good" | "no match",
+  "match_explanation": "A brief explanation here."
+}}
+
+Classify the match of this candidate to the following job:
+
+Job Details:
+{job_block(job)}
+"""
+
+
+def build_batch_prompt(jobs, resume_text, candidate_domain, candidate_salary_range, prefix=None):
+    prefix = prefix or build_matching_prefix(resume_text, candidate_domain, candidate_salary_range)
+    blocks = "\n\n".join(f"Item Number: {job['item_number']}\n{job_block(job)}" for job in jobs)
+    return f"""{prefix}
+Only return a pure JSON array with exactly one object per job, in any order.
+Each object MUST have the following structure:
+{{
+  "item_number": "the job's Item Number",
+  "resume_match_level": "minimum" | "good" | "no match",
+  "match_explanation": "A brief explanation here."
+}}
+
+Classify the match of this candidate to EACH of the following {len(jobs)} jobs independently:
+
+Jobs:
+{blocks}
+"""
+
+
+def parse_match_response(response):
+    try:
+        parsed = json.loads(response)
+        match_level = parsed.get("resume_match_level", "no match").lower()
+        explanation = parsed.get("match_explanation", "")
+    except json.JSONDecodeError:
+        match_level = "no match"
+        explanation = f"{EVALUATION_ERROR}: Unable to parse JSON. Raw response: {response}"
+    return match_level, explanation
+
+
+async def classify_job(job, resume_text, candidate_domain, candidate_salary_range, client=None, limiter=None,
+                       cache=None, meter=None, prefix=None):
+    prompt = build_matching_prompt(job, resume_text, candidate_domain, candidate_salary_range, prefix)
+    try:
+        response, _ = await acomplete(
+            prompt, MAX_TOKENS_PER_JOB, 0.0, client=client, limiter=limiter, cache=cache,
+            meter=meter, label=f"match {job['item_number']}", validate=json_object
+        )
+        match_level, explanation = parse_match_response(response)
+    except Exception as e:
+        match_level = "no match"
+        explanation = f"{EVALUATION_ERROR}: {e}"
+    return match_result(job, match_level, explanation)
+
+
+def parse_batch_response(response, jobs):
+    # Returns {item_number: result} for every well-formed entry that belongs to
+    # this batch. Raises ValueError when the response is not a JSON array.
+    parsed = json.loads(response)
+    if not isinstance(parsed, list):
+        raise ValueError("batch response is not a JSON array")
+    by_id = {job['item_number']: job for job in jobs}
+    results = {}
+    for entry in parsed:
+        if not isinstance(entry, dict):
+            continue
+        item_id = str(entry.get("item_number", "")).strip()
+        level = str(entry.get("resume_match_level", "")).lower()
+        if item_id in by_id and level in MATCH_LEVELS:
+            results[item_id] = match_result(by_id[item_id], level, entry.get("match_explanation", ""))
+    return results
+
+
+async def classify_batch(jobs, resume_text, candidate_domain, candidate_salary_range, client=None, limiter=None,
+                         cache=None, meter=None, prefix=None):
+    # One request for the whole batch. Jobs missing from a malformed or
+    # partial response are retried one at a time with classify_job.
+    # Returns (results, fallbacks).
+    args = (resume_text, candidate_domain, candidate_salary_range, client, limiter, cache, meter, prefix)
+    if len(jobs) == 1:
+        return [await classify_job(jobs[0], *args)], 0
+
+    prompt = build_batch_prompt(jobs, resume_text, candidate_domain, candidate_salary_range, prefix)
+    try:
+        response, _ = await acomplete(
+            prompt, MAX_TOKENS_PER_JOB * len(jobs), 0.0, client=client, limiter=limiter, cache=cache,
+            meter=meter, label=f"match batch of {len(jobs)}",
+            validate=lambda reply: parse_batch_response(reply, jobs)
+        )
+        by_id = parse_batch_response(response, jobs)
+    except Exception:
+        by_id = {}
+
+    results = []
+    fallbacks = 0
+    for job in jobs:
+        result = by_id.get(job['item_number'])
+        if result is None:
+            fallbacks += 1
+            result = await classify_job(job, *args)
+        results.append(result)
+    return results, fallbacks
+
+
+def verdict_fingerprint(job, candidate_domain, candidate_salary_range):
+    # Hash of everything an LLM verdict depends on besides the resume itself
+    # (checkpoints are kept per resume): the job as prompted, salary gap
+    # included, and the resume analysis.
+    payload = json.dumps([job, candidate_domain, candidate_salary_range], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+async def run_matching_async(jobs, resume_text, candidate_domain, candidate_salary_range,
+                             batch_size=DEFAULT_BATCH_SIZE, concurrency=DEFAULT_CONCURRENCY,
+                             client=None, limiter=None, cache=None, top_n=None, min_score=None,
+                             salary_mode="off", salary_tolerance=DEFAULT_TOLERANCE, semantic_index=None,
+                             semantic_top_k=None, meter=None, on_progress=None, sink=None, features=None,
+                             semaphore=None, skip_expired=True):
+    # Classifies every job and returns (results, stats). Up to `concurrency`
+    # requests are in flight at once; results stay in the same order as jobs.
+    # Before any LLM call:
+    # - salary_mode "skip" classifies jobs paying more than salary_tolerance
+    #   (relative to the candidate's midpoint) outside the candidate's range,
+    #   "deprioritize" sends them last; either way prompts get the numeric gap.
+    # - semantic_index / semantic_top_k keep only the k jobs closest to the
+    #   resume in embedding space (jobs missing from the index are added).
+    # - top_n / min_score pre-rank jobs locally (BM25 against the resume and
+    #   domain) and only the survivors go to the LLM.
+    # sink, a JsonlSink, receives every LLM verdict as it arrives; a job
+    # whose verdict an interrupted run already holds is not sent again,
+    # unless the job or the resume analysis has changed since. Decisions
+    # made before the LLM are cheap and always recomputed with this run's
+    # options, and failed evaluations are not checkpointed, so both are
+    # retried on resume.
+    # - skip_expired classifies jobs whose application deadline has passed.
+    # The remaining jobs are sent soonest deadline first (after the salary
+    # ordering above), so a partial or time-boxed run covers the most urgent
+    # postings. features, a JobFeatures built from this same jobs list,
+    # replaces the per-run job-side work; semaphore, a PrioritySemaphore
+    # shared between runs, bounds their combined in-flight requests instead
+    # of `concurrency` per run and serves urgent batches of every run first.
+    # stats reports tokens and seconds per LLM-classified job so batched and
+    # unbatched runs can be compared.
+    if features is not None and (features.jobs is not jobs or features.skip_expired != skip_expired):
+        raise ValueError("features were built for a different job list or expiry setting")
+    batch_size = max(1, int(batch_size))
+    total = len(jobs)
+    jobs_with_gap = {}
+    results = [None] * total
+    pending = []
+    expired = 0
+    for i, job in enumerate(jobs):
+        result = precheck(job, skip_expired) if features is None else features.prechecks[i]
+        if result is None:
+            pending.append(i)
+        else:
+            results[i] = result
+            if skip_expired and 'error' not in job and is_expired(job):
+                expired += 1
+    pending = soonest_first(pending, job=jobs.__getitem__)
+
+    salary_skipped = 0
+    semantic_pruned = 0
+    far_jobs = set()
+    candidate_range = parse_salary(candidate_salary_range) if salary_mode != "off" else None
+    if candidate_range and pending:
+        candidate_min, candidate_max = candidate_range[0], candidate_range[1]
+        if features is None:
+            mins, maxs = salary_arrays([jobs[i] for i in pending])
+        else:
+            mins, maxs = features.mins[pending], features.maxs[pending]
+        gaps = salary_gaps(mins, maxs, candidate_min, candidate_max)
+        relative = relative_gaps(gaps, candidate_min, candidate_max)
+        far = np.abs(relative) > salary_tolerance  # NaN (unparsed) compares False
+        near_pending, far_pending = [], []
+        for position, i in enumerate(pending):
+            note = describe_gap(gaps[position], relative[position])
+            if far[position] and salary_mode == "skip":
+                results[i] = match_result(jobs[i], "no match", f"Skipped before LLM evaluation: {note}")
+                salary_skipped += 1
+                continue
+            # Copy so the gap only lives in this run's prompts.
+            jobs_with_gap[i] = dict(jobs[i], salary_gap=note)
+            (far_pending if far[position] else near_pending).append(i)
+        pending = near_pending + far_pending
+        far_jobs.update(far_pending)
+
+    if semantic_index is not None and semantic_top_k and len(pending) > semantic_top_k:
+        if features is None:
+            semantic_index.add([jobs[i] for i in pending])
+        else:
+            features.embed(semantic_index)
+        ranked = semantic_index.rank(
+            f"{candidate_domain}\n{resume_text}", item_numbers=[jobs[i]['item_number'] for i in pending]
+        )
+        semantic_rank = {item_id: (rank, score) for rank, (item_id, score) in enumerate(ranked, start=1)}
+        kept_semantic = []
+        for i in pending:
+            rank, score = semantic_rank.get(jobs[i]['item_number'], (None, 0.0))
+            if rank is not None and rank > semantic_top_k:
+                results[i] = match_result(jobs[i], "no match", (
+                    f"Skipped before LLM evaluation: semantic similarity to the resume {score:.2f} "
+                    f"(rank {rank} of {len(ranked)}), outside the top {semantic_top_k}."
+                ))
+                semantic_pruned += 1
+            else:
+                kept_semantic.append(i)
+        pending = kept_semantic
+
+    kept, pruned = prerank(
+        [jobs[i] for i in pending], resume_text, candidate_domain, top_n, min_score,
+        term_index=features.term_index if features is not None else None, rows=pending
+    )
+    for position, (score, rank) in pruned.items():
+        i = pending[position]
+        results[i] = match_result(
+            jobs[i], "no match", pruned_explanation(score, rank, len(pending), top_n, min_score)
+        )
+    pending = [pending[position] for position in kept]
+
+    resumed = 0
+    fingerprints = {}
+    if sink is not None:
+        still_pending = []
+        for i in pending:
+            fingerprints[i] = verdict_fingerprint(
+                jobs_with_gap.get(i, jobs[i]), candidate_domain, candidate_salary_range
+            )
+            record = sink.completed.get(jobs[i]['item_number'])
+            if record is not None and record.get(FINGERPRINT_KEY) == fingerprints[i]:
+                results[i] = {key: value for key, value in record.items() if key != FINGERPRINT_KEY}
+                resumed += 1
+            else:
+                still_pending.append(i)
+        pending = still_pending
+
+    done = total - len(pending)
+    if on_progress and done:
+        on_progress(done, total)
+
+    meter = meter or UsageMeter()
+    prefix = build_matching_prefix(resume_text, candidate_domain, candidate_salary_range)
+    semaphore = semaphore or PrioritySemaphore(concurrency)
+
+    async def run_batch(indexes):
+        # Near-salary jobs before far ones, then soonest deadline first.
+        priority = (indexes[0] in far_jobs,) + deadline_priority(jobs[indexes[0]])
+        async with semaphore.slot(priority):
+            batch = [jobs_with_gap.get(i, jobs[i]) for i in indexes]
+            batch_results, fallbacks = await classify_batch(
+                batch, resume_text, candidate_domain, candidate_salary_range, client, limiter, cache, meter, prefix
+            )
+        return indexes, batch_results, fallbacks
+
+    fallbacks = 0
+    start = time.perf_counter()
+    tasks = [
+        asyncio.ensure_future(run_batch(pending[offset:offset + batch_size]))
+        for offset in range(0, len(pending), batch_size)
+    ]
+    for future in asyncio.as_completed(tasks):
+        indexes, batch_results, batch_fallbacks = await future
+        for i, result in zip(indexes, batch_results):
+            results[i] = result
+            if sink is not None and not result['match_explanation'].startswith(EVALUATION_ERROR):
+                sink.write(dict(result, **{FINGERPRINT_KEY: fingerprints[i]}))
+        fallbacks += batch_fallbacks
+        done += len(indexes)
+        if on_progress:
+            on_progress(done, total)
+    elapsed = time.perf_counter() - start
+
+    llm_jobs = len(pending)
+    usage = meter.totals()
+    stats = {
+        "batch_size": batch_size,
+        "concurrency": int(concurrency),
+        "llm_jobs": llm_jobs,
+        "resumed": resumed,
+        "expired": expired,
+        "semantic_pruned": semantic_pruned,
+        "pruned": len(pruned),
+        "salary_skipped": salary_skipped,
+        "fallbacks": fallbacks,
+        "llm_calls": usage["calls"],
+        "prompt_tokens": usage["prompt_tokens"],
+        "cached_tokens": usage["cached_tokens"],
+        "completion_tokens": usage["completion_tokens"],
+        "cache_hits": usage["cache_hits"],
+        "seconds": elapsed,
+        "tokens_per_job": (usage["prompt_tokens"] + usage["completion_tokens"]) / llm_jobs if llm_jobs else 0.0,
+        "seconds_per_job": elapsed / llm_jobs if llm_jobs else 0.0
+    }
+    return results, stats
+
+
+def run_matching(jobs, resume_text, candidate_domain, candidate_salary_range, **kwargs):
+    # Blocking entry point for Streamlit buttons and scripts.
+    return asyncio.run(run_matching_async(jobs, resume_text, candidate_domain, candidate_salary_range, **kwargs))
@@ -0,0 +1,176 @@
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+# Latency histogram buckets in seconds, Prometheus style (cumulative "le").
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# Raw samples kept per stage for p50/p95; older samples are dropped first.
+MAX_SAMPLES = 10000
+
+
+class _NullSpan:
+    # Returned by Metrics.span() while disabled: no clock reads, no locking.
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def count(self, name, value=1):
+        pass
+
+
+NULL_SPAN = _NullSpan()
+
+
+class Span:
+    __slots__ = ("metrics", "stage", "start")
+
+    def __init__(self, metrics, stage):
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.observe(self.stage, time.perf_counter() - self.start, error=exc_type is not None)
+        return False
+
+    def count(self, name, value=1):
+        self.metrics.count(name, value, self.stage)
+
+
+class Metrics:
+    # Process-wide timing spans and counters for the hot paths (HTTP fetch,
+    # HTML parse, field extraction, resume extraction, LLM calls, document
+    # writes). Disabled by default; set STATEJOBS_METRICS=1 or call enable().
+    # Safe to use from the fetch threads and the asyncio loop at once.
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.reset()
+
+    def enable(self, enabled=True):
+        self.enabled = enabled
+
+    def reset(self):
+        with self._lock:
+            self._histograms = {}
+            self._samples = {}
+            self._errors = {}
+            self._counters = {}
+            self.started_at = time.time()
+
+    def span(self, stage):
+        # with METRICS.span("fetch") as span: ...; span.count("bytes", n)
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, stage)
+
+    def observe(self, stage, seconds, error=False):
+        if not self.enabled:
+            return
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = self._histograms[stage] = {"buckets": [0] * len(BUCKETS), "count": 0, "sum": 0.0}
+                self._samples[stage] = []
+                self._errors[stage] = 0
+            for position, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    histogram["buckets"][position] += 1
+                    break
+            histogram["count"] += 1
+            histogram["sum"] += seconds
+            samples = self._samples[stage]
+            samples.append(seconds)
+            if len(samples) > MAX_SAMPLES:
+                del samples[:len(samples) - MAX_SAMPLES]
+            if error:
+                self._errors[stage] += 1
+
+    def count(self, name, value=1, stage=""):
+        # Counters such as bytes, retries, prompt_tokens, keyed by stage.
+        if not self.enabled or not value:
+            return
+        with self._lock:
+            key = (name, stage)
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def summary(self):
+        with self._lock:
+            histograms = {stage: dict(h, buckets=list(h["buckets"])) for stage, h in self._histograms.items()}
+            samples = {stage: list(s) for stage, s in self._samples.items()}
+            errors = dict(self._errors)
+            counters = dict(self._counters)
+        stages = {}
+        for stage, histogram in sorted(histograms.items()):
+            p50, p95 = np.percentile(samples[stage], [50, 95]) if samples[stage] else (0.0, 0.0)
+            stages[stage] = {
+                "count": histogram["count"],
+                "errors": errors[stage],
+                "seconds_total": histogram["sum"],
+                "p50": float(p50),
+                "p95": float(p95),
+                "max": max(samples[stage], default=0.0)
+            }
+        counter_summary = {}
+        for (name, stage), value in sorted(counters.items()):
+            counter_summary.setdefault(name, {})[stage or "all"] = value
+        return {
+            "started_at": self.started_at,
+            "wall_seconds": time.time() - self.started_at,
+            "stages": stages,
+            "counters": counter_summary
+        }
+
+    def prometheus(self):
+        with self._lock:
+            histograms = {stage: dict(h, buckets=list(h["buckets"])) for stage, h in self._histograms.items()}
+            counters = dict(self._counters)
+        lines = [
+            "# HELP statejobs_stage_seconds Time spent per pipeline stage.",
+            "# TYPE statejobs_stage_seconds histogram"
+        ]
+        for stage, histogram in sorted(histograms.items()):
+            cumulative = 0
+            for bound, n in zip(BUCKETS, histogram["buckets"]):
+                cumulative += n
+                lines.append(f'statejobs_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'statejobs_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {histogram["count"]}')
+            lines.append(f'statejobs_stage_seconds_sum{{stage="{stage}"}} {histogram["sum"]}')
+            lines.append(f'statejobs_stage_seconds_count{{stage="{stage}"}} {histogram["count"]}')
+        for name in sorted({name for name, _ in counters}):
+            lines.append(f"# TYPE statejobs_{name}_total counter")
+            for (counter, stage), value in sorted(counters.items()):
+                if counter == name:
+                    lines.append(f'statejobs_{name}_total{{stage="{stage}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        # Textfile-collector format; written atomically so a scraper never
+        # reads half a file.
+        _write_atomic(path, self.prometheus())
+
+    def write_summary(self, path):
+        _write_atomic(path, json.dumps(self.summary(), indent=2))
+
+
+def _write_atomic(path, text):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+METRICS = Metrics(enabled=os.getenv("STATEJOBS_METRICS", "") not in ("", "0"))
@@ -0,0 +1,313 @@
+import re
+from html.parser import HTMLParser
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+from statejobs.metrics import METRICS
+
+try:
+    import lxml  # noqa: F401
+    HAVE_LXML = True
+except ImportError:
+    HAVE_LXML = False
+
+try:
+    from selectolax.lexbor import LexborHTMLParser as SelectolaxParser
+except ImportError:
+    try:
+        from selectolax.parser import HTMLParser as SelectolaxParser
+    except ImportError:
+        SelectolaxParser = None
+
+# Fastest first. "selectolax" only has a dedicated path for the vacancy table;
+# detail pages use the best BeautifulSoup tree builder available instead.
+BACKENDS = ("selectolax", "lxml", "html.parser")
+
+
+def available_backends():
+    backends = []
+    if SelectolaxParser is not None:
+        backends.append("selectolax")
+    if HAVE_LXML:
+        backends.append("lxml")
+    backends.append("html.parser")
+    return backends
+
+
+def default_backend():
+    return available_backends()[0]
+
+
+def _soup_features(backend):
+    # BeautifulSoup tree builder for a backend name, falling back to the
+    # pure-Python parser when the requested one is not installed.
+    if backend in ("lxml", "selectolax") and HAVE_LXML:
+        return "lxml"
+    return "html.parser"
+
+
+def _section_name(heading):
+    # "Location" -> "location", "Contact Information" -> "contact"
+    words = heading.split()
+    return words[0].lower() if words else ""
+
+
+def _job_from_cells(cells):
+    return {
+        "item_number": cells[0],
+        "job_title": cells[1],
+        "salary_grade": cells[2],
+        "posting_date": cells[3],
+        "application_deadline": cells[4],
+        "agency": cells[5],
+        "county": cells[6]
+    }
+
+
+def _parse_vacancy_table_selectolax(content):
+    tree = SelectolaxParser(content)
+    jobs = []
+    for row in tree.css('table tbody tr'):
+        cols = row.css('td')
+        if len(cols) < 7:
+            continue
+        # strip=True strips each text node like get_text(strip=True) does.
+        jobs.append(_job_from_cells([col.text(deep=True, separator='', strip=True) for col in cols[:7]]))
+    return jobs
+
+
+def parse_vacancy_table(content, backend=None):
+    with METRICS.span("parse_table"):
+        return _parse_vacancy_table(content, backend or default_backend())
+
+
+def _parse_vacancy_table(content, backend):
+    if backend == "selectolax" and SelectolaxParser is not None:
+        return _parse_vacancy_table_selectolax(content)
+
+    # Only the tables matter, so skip building nodes for the rest of the page.
+    soup = BeautifulSoup(content, _soup_features(backend), parse_only=SoupStrainer('table'))
+    rows = soup.select('table tbody tr')
+    jobs = []
+    for row in rows:
+        cols = row.find_all('td')
+        if len(cols) < 7:
+            continue
+        jobs.append(_job_from_cells([col.get_text(strip=True) for col in cols[:7]]))
+    return jobs
+
+
+class VacancyRowParser(HTMLParser):
+    # Incremental parser for the vacancy table: feed() it the page in chunks
+    # and pop_rows() returns the jobs whose </tr> has arrived so far. Matches
+    # the 'table tbody tr' rows with at least 7 cells that the tree parsers
+    # above select, without ever holding the whole page or a tree.
+
+    def __init__(self):
+        super().__init__()
+        self.table_depth = 0
+        self.tbody_depth = 0
+        self.cells = None
+        self.cell = None
+        self.text = []
+        self.rows = []
+
+    def handle_starttag(self, tag, attrs):
+        self._end_text()
+        if tag == 'table':
+            self.table_depth += 1
+        elif tag == 'tbody' and self.table_depth:
+            self.tbody_depth += 1
+        elif tag == 'tr' and self.tbody_depth:
+            self._end_row()
+            self.cells = []
+        elif tag == 'td' and self.cells is not None:
+            self._end_cell()
+            self.cell = []
+
+    def handle_endtag(self, tag):
+        self._end_text()
+        if tag == 'td':
+            self._end_cell()
+        elif tag == 'tr':
+            self._end_row()
+        elif tag == 'tbody' and self.tbody_depth:
+            self._end_row()
+            self.tbody_depth -= 1
+        elif tag == 'table' and self.table_depth:
+            self._end_row()
+            self.table_depth -= 1
+
+    def handle_data(self, data):
+        # A text node can arrive in pieces when it spans two chunks.
+        if self.cell is not None:
+            self.text.append(data)
+
+    def handle_comment(self, data):
+        self._end_text()
+
+    def _end_text(self):
+        # Like get_text(strip=True): strip every text node, then join.
+        if self.text:
+            text = "".join(self.text).strip()
+            if text:
+                self.cell.append(text)
+            self.text = []
+
+    def _end_cell(self):
+        if self.cell is not None:
+            self.cells.append("".join(self.cell))
+            self.cell = None
+
+    def _end_row(self):
+        if self.cells is None:
+            return
+        self._end_cell()
+        if len(self.cells) >= 7:
+            self.rows.append(_job_from_cells(self.cells[:7]))
+        self.cells = None
+
+    def close(self):
+        # A page cut off mid-row still yields that row, like the tree parsers.
+        super().close()
+        self._end_text()
+        self._end_row()
+
+    def pop_rows(self):
+        rows, self.rows = self.rows, []
+        return rows
+
+
+def iter_vacancy_rows(chunks):
+    # Yields vacancy-table jobs from an iterable of decoded text chunks as
+    # soon as each row is complete.
+    parser = VacancyRowParser()
+    for chunk in chunks:
+        parser.feed(chunk)
+        yield from parser.pop_rows()
+    parser.close()
+    yield from parser.pop_rows()
+
+
+def parse_job_details(html, item_id, backend=None, include_sections=False):
+    with METRICS.span("parse"):
+        detail_soup = BeautifulSoup(html, _soup_features(backend or default_backend()))
+    with METRICS.span("extract"):
+        return _extract_job_details(detail_soup, item_id, include_sections)
+
+
+def _extract_job_details(detail_soup, item_id, include_sections):
+
+    # Extract posting date, application deadline, vacancy ID
+    posting_date = ""
+    application_deadline = ""
+    vacancy_id = item_id
+    top_header = detail_soup.find('h2', text="Review Vacancy")
+    if top_header:
+        top_p = top_header.find_next('p')
+        if top_p:
+            text = top_p.get_text(" ", strip=True)
+            date_posted_match = re.search(r"Date Posted:\s*(\d{1,2}/\d{1,2}/\d{2})", text)
+            app_due_match = re.search(r"Applications Due:\s*(\d{1,2}/\d{1,2}/\d{2})", text)
+            vacancy_id_match = re.search(r"Vacancy ID:\s*(\d+)", text)
+            if date_posted_match:
+                posting_date = date_posted_match.group(1)
+            if app_due_match:
+                application_deadline = app_due_match.group(1)
+            if vacancy_id_match:
+                vacancy_id = vacancy_id_match.group(1)
+
+    # Single pass over the details block. Every <p class="row"> is recorded
+    # three ways: under its bare label (last one wins, as before), qualified
+    # by the enclosing <h3> section (location.City vs contact.City), and in a
+    # per-section map for callers that want every field.
+    fields_map = {}
+    qualified = {}
+    outside_contact = {}
+    sections = {}
+
+    vacancy_details = detail_soup.find('div', id='vacancyDetails')
+    if vacancy_details:
+        section = ""
+        section_title = ""
+        subsection = ""
+        for node in vacancy_details.find_all(['h3', 'h5', 'p']):
+            if node.name == 'h3':
+                section_title = node.get_text(" ", strip=True)
+                section = _section_name(section_title)
+                subsection = ""
+                continue
+            if node.name == 'h5':
+                subsection = node.get_text(" ", strip=True)
+                continue
+            if 'row' not in node.get('class', []):
+                continue
+            left = node.find('span', class_='leftCol')
+            right = node.find('span', class_='rightCol')
+            if not (left and right):
+                continue
+            key = left.get_text(strip=True)
+            val = right.get_text(" ", strip=True)
+            fields_map[key] = val
+            qualified[f"{section}.{key}"] = val
+            if section != "contact":
+                outside_contact.setdefault(key, val)
+            section_fields = sections.setdefault(section_title, {})
+            if subsection:
+                section_fields.setdefault(subsection, {})[key] = val
+            else:
+                section_fields[key] = val
+
+    job_title = fields_map.get("Title", "")
+    duties_description = fields_map.get("Duties Description", "")
+    minimum_qualifications = fields_map.get("Minimum Qualifications", "")
+    preferred_qualifications = ""  # not present on the detail page
+    salary_range = fields_map.get("Salary Range", "")
+    application_procedure = fields_map.get("Notes on Applying", "")
+
+    def location_field(key):
+        return qualified.get(f"location.{key}", outside_contact.get(key, ""))
+
+    def contact_field(key):
+        return qualified.get(f"contact.{key}", "")
+
+    location_pieces = [location_field(key) for key in ("Street Address", "City", "State", "Zip Code")]
+    location = ", ".join([p for p in location_pieces if p.strip()])
+
+    contact_name = qualified.get("contact.Name", fields_map.get("Name", ""))
+    contact_phone = qualified.get("contact.Telephone", fields_map.get("Telephone", ""))
+    contact_fax = qualified.get("contact.Fax", fields_map.get("Fax", ""))
+    contact_email = qualified.get("contact.Email Address", fields_map.get("Email Address", ""))
+    contact_addr_pieces = [contact_field(key) for key in ("Street", "City", "State", "Zip Code")]
+    contact_address = ", ".join([p for p in contact_addr_pieces if p.strip()])
+
+    contact_info_parts = []
+    if contact_name:
+        contact_info_parts.append(f"Name: {contact_name}")
+    if contact_phone:
+        contact_info_parts.append(f"Phone: {contact_phone}")
+    if contact_fax:
+        contact_info_parts.append(f"Fax: {contact_fax}")
+    if contact_email:
+        contact_info_parts.append(f"Email: {contact_email}")
+    if contact_address:
+        contact_info_parts.append(f"Address: {contact_address}")
+
+    contact_information = "\n".join(contact_info_parts)
+
+    details = {
+        "item_number": vacancy_id,
+        "posting_date": posting_date,
+        "application_deadline": application_deadline,
+        "job_title": job_title,
+        "minimum_qualifications": minimum_qualifications,
+        "preferred_qualifications": preferred_qualifications,
+        "duties_description": duties_description,
+        "salary_range": salary_range,
+        "location": location,
+        "application_procedure": application_procedure,
+        "contact_information": contact_information
+    }
+    if include_sections:
+        details["sections"] = sections
+    return details
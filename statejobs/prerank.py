@@ -0,0 +1,139 @@
+import re
+from collections import Counter
+
+import numpy as np
+
+TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#.]*[a-z0-9+#]|[a-z0-9]")
+STOPWORDS = frozenset("""
+a an and are as at be by for from has have in is it its of on or that the this to was were will with
+you your our we they their other such may must any all per including within under upon
+""".split())
+BM25_K1 = 1.5
+BM25_B = 0.75
+# The title says the most about a job's domain, so it counts twice.
+TITLE_WEIGHT = 2
+# Same idea for the inferred candidate domain on the query side.
+DOMAIN_WEIGHT = 3
+
+
+def tokenize(text):
+    return [t for t in TOKEN_RE.findall((text or "").lower()) if t not in STOPWORDS]
+
+
+def job_tokens(job):
+    tokens = tokenize(job.get('job_title', '')) * TITLE_WEIGHT
+    tokens += tokenize(job.get('duties_description', ''))
+    tokens += tokenize(job.get('minimum_qualifications', ''))
+    return tokens
+
+
+def bm25_scores(docs, query_tokens, k1=BM25_K1, b=BM25_B):
+    # Scores every tokenized doc against the query in one vectorized pass.
+    # Only query terms can contribute, so the term-frequency matrix is
+    # n_docs x n_query_terms rather than the full vocabulary.
+    query_counts = Counter(query_tokens)
+    if not docs or not query_counts:
+        return np.zeros(len(docs), dtype=np.float32)
+    terms = list(query_counts)
+    column = {term: j for j, term in enumerate(terms)}
+
+    tf = np.zeros((len(docs), len(terms)), dtype=np.float32)
+    lengths = np.empty(len(docs), dtype=np.float32)
+    for i, tokens in enumerate(docs):
+        lengths[i] = len(tokens)
+        for term, count in Counter(t for t in tokens if t in column).items():
+            tf[i, column[term]] = count
+    return _bm25(tf, lengths, [query_counts[t] for t in terms], k1, b)
+
+
+def _bm25(tf, lengths, query_counts, k1, b):
+    n_docs = len(tf)
+    df = np.count_nonzero(tf, axis=0)
+    idf = np.log1p((n_docs - df + 0.5) / (df + 0.5)).astype(np.float32)
+    avgdl = max(float(lengths.mean()), 1.0)
+    norm = k1 * (1 - b + b * lengths / avgdl)
+    saturated = tf * (k1 + 1) / (tf + norm[:, None])
+    # Repeated resume terms matter, but sub-linearly.
+    query_weights = np.log1p(np.array(query_counts, dtype=np.float32))
+    return saturated @ (idf * query_weights)
+
+
+class TermIndex:
+    # Inverted index (term -> rows, counts) over job_tokens for a fixed job
+    # set. Tokenizing the jobs dominates pre-ranking, so when many resumes
+    # are scored against the same jobs this is built once and each resume
+    # only touches the postings of its own terms.
+
+    def __init__(self, jobs):
+        self.size = len(jobs)
+        self.lengths = np.empty(self.size, dtype=np.float32)
+        postings = {}
+        for i, job in enumerate(jobs):
+            tokens = job_tokens(job)
+            self.lengths[i] = len(tokens)
+            for term, count in Counter(tokens).items():
+                postings.setdefault(term, ([], []))
+                postings[term][0].append(i)
+                postings[term][1].append(count)
+        self.postings = {
+            term: (np.array(rows, dtype=np.int64), np.array(counts, dtype=np.float32))
+            for term, (rows, counts) in postings.items()
+        }
+
+    def bm25_scores(self, query_tokens, rows=None, k1=BM25_K1, b=BM25_B):
+        # Same scores as bm25_scores over the jobs at `rows` (all by default);
+        # document frequencies are taken over those rows only.
+        rows = np.arange(self.size) if rows is None else np.asarray(rows, dtype=np.int64)
+        query_counts = Counter(query_tokens)
+        if not len(rows) or not query_counts:
+            return np.zeros(len(rows), dtype=np.float32)
+        terms = list(query_counts)
+        tf = np.zeros((self.size, len(terms)), dtype=np.float32)
+        for j, term in enumerate(terms):
+            posting = self.postings.get(term)
+            if posting is not None:
+                tf[posting[0], j] = posting[1]
+        return _bm25(tf[rows], self.lengths[rows], [query_counts[t] for t in terms], k1, b)
+
+
+def prerank(jobs, resume_text, candidate_domain, top_n=None, min_score=None, term_index=None, rows=None):
+    # Splits jobs into (kept, pruned_scores). Scores are normalised so the best
+    # job scores 1.0; a job is kept if it is in the top_n and at or above
+    # min_score (either limit may be None). pruned_scores maps the index of
+    # each pruned job to (score, rank). With a TermIndex, jobs are the index
+    # rows given by `rows` and are not tokenized again.
+    if not jobs or (top_n is None and min_score is None):
+        return list(range(len(jobs))), {}
+
+    query = tokenize(resume_text) + tokenize(candidate_domain) * DOMAIN_WEIGHT
+    if term_index is not None:
+        raw = term_index.bm25_scores(query, rows)
+    else:
+        raw = bm25_scores([job_tokens(job) for job in jobs], query)
+    best = float(raw.max()) if len(raw) else 0.0
+    scores = raw / best if best > 0 else raw
+
+    order = np.argsort(-scores, kind="stable")
+    ranks = np.empty(len(jobs), dtype=np.int64)
+    ranks[order] = np.arange(1, len(jobs) + 1)
+    keep = np.ones(len(jobs), dtype=bool)
+    if top_n is not None:
+        keep &= ranks <= top_n
+    if min_score is not None:
+        keep &= scores >= min_score
+
+    kept = [int(i) for i in np.flatnonzero(keep)]
+    pruned = {int(i): (float(scores[i]), int(ranks[i])) for i in np.flatnonzero(~keep)}
+    return kept, pruned
+
+
+def pruned_explanation(score, rank, total, top_n=None, min_score=None):
+    limits = []
+    if top_n is not None:
+        limits.append(f"top {top_n}")
+    if min_score is not None:
+        limits.append(f"score >= {min_score:.2f}")
+    return (
+        f"Skipped before LLM evaluation: lexical relevance to the resume scored {score:.2f} "
+        f"(rank {rank} of {total}), outside the pre-ranking cutoff ({', '.join(limits)})."
+    )
@@ -0,0 +1,100 @@
+import hashlib
+import io
+import json
+
+# Fastest available PDF text extractor first; PyPDF2 is the baseline the
+# app has always depended on.
+try:
+    import pypdfium2
+except ImportError:
+    pypdfium2 = None
+
+try:
+    import fitz  # PyMuPDF
+except ImportError:
+    fitz = None
+
+import PyPDF2
+
+from statejobs.llm import complete, json_object
+from statejobs.metrics import METRICS
+from statejobs.salary import parse_salary
+
+
+def resume_digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def resume_id(resume_text):
+    # Key under which a resume's match results are stored.
+    return hashlib.sha256(resume_text.encode("utf-8")).hexdigest()[:16]
+
+
+def pdf_backend():
+    if pypdfium2 is not None:
+        return "pypdfium2"
+    if fitz is not None:
+        return "pymupdf"
+    return "PyPDF2"
+
+
+def extract_pdf_text(data, backend=None):
+    backend = backend or pdf_backend()
+    pages = []
+    if backend == "pypdfium2":
+        pdf = pypdfium2.PdfDocument(data)
+        try:
+            for page in pdf:
+                text_page = page.get_textpage()
+                pages.append(text_page.get_text_range().replace("\r\n", "\n"))
+                text_page.close()
+                page.close()
+        finally:
+            pdf.close()
+    elif backend == "pymupdf":
+        with fitz.open(stream=data, filetype="pdf") as pdf:
+            pages = [page.get_text() for page in pdf]
+    else:
+        pdf_reader = PyPDF2.PdfReader(io.BytesIO(data))
+        pages = [page.extract_text() or "" for page in pdf_reader.pages]
+    # One join instead of growing a string page by page.
+    return "".join(f"{text}\n" for text in pages)
+
+
+def extract_resume_text(data, filetype, backend=None):
+    with METRICS.span("resume_extract") as span:
+        span.count("bytes", len(data))
+        if filetype == 'pdf':
+            return extract_pdf_text(data, backend)
+        return data.decode('utf-8', errors='ignore')
+
+
+def build_analysis_prompt(resume_text):
+    return f"""
+You are an expert career advisor. Analyze the candidate's resume below and infer the candidate's professional domain (e.g. "Nursing", "Data Engineering", "Accounting", "Teaching", etc.) and provide a reasonable current salary range based on their experience and role indicated in the resume. Be practical and consider typical salaries for the given role and experience level.
+
+Resume:
+{resume_text}
+
+Respond in JSON with the following format:
+{{
+  "candidate_domain": "string describing domain",
+  "candidate_salary_range": "string describing approximate current salary range, e.g. '$70,000-$90,000'"
+}}
+"""
+
+
+def analyze_resume(resume_text, client=None, cache=None):
+    # Infers the candidate's domain and salary range. Raises on API errors or
+    # a non-JSON response, like the inline version on the matching page did.
+    response, _ = complete(
+        build_analysis_prompt(resume_text), max_tokens=300, temperature=0.0, client=client, cache=cache,
+        validate=json_object
+    )
+    parsed = json.loads(response)
+    candidate_salary_range = parsed.get("candidate_salary_range", "")
+    return {
+        "candidate_domain": parsed.get("candidate_domain", ""),
+        "candidate_salary_range": candidate_salary_range,
+        "candidate_salary": parse_salary(candidate_salary_range)
+    }
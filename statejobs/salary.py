@@ -0,0 +1,87 @@
+import re
+
+import numpy as np
+
+# Pay periods per year, used to normalise every range to an annual figure.
+PERIODS = (
+    ("semi-monthly", 24, re.compile(r"semi-?monthly")),
+    ("biweekly", 26, re.compile(r"bi-?weekly")),
+    ("weekly", 52, re.compile(r"weekly|per week|/\s*wk")),
+    ("monthly", 12, re.compile(r"monthly|per month|/\s*mo")),
+    ("daily", 260, re.compile(r"daily|per day|per diem")),
+    ("hourly", 2080, re.compile(r"hourly|per hour|an hour|/\s*hr|/\s*hour")),
+    ("annual", 1, re.compile(r"annual|yearly|per year|a year|/\s*yr|/\s*year")),
+)
+AMOUNT_RE = re.compile(r"\$\s*(\d[\d,]*(?:\.\d+)?)\s*([kK])?|(\d[\d,]*(?:\.\d+)?)\s*([kK])\b")
+# Amounts this small without a period word are assumed to be hourly.
+HOURLY_CEILING = 200
+DEFAULT_TOLERANCE = 0.25
+
+
+def parse_salary(text):
+    # "$42,939 to $52,989 Annually" -> (42939.0, 52989.0, "annual")
+    # "$25.50 - $30 per hour"       -> (53040.0, 62400.0, "hourly")
+    # Only dollar amounts (or 70k-style amounts) count, so bare salary grades
+    # such as "18" or "M-3" return None.
+    text = text or ""
+    amounts = []
+    for match in AMOUNT_RE.finditer(text):
+        number = match.group(1) or match.group(3)
+        value = float(number.replace(",", ""))
+        if match.group(2) or match.group(4):
+            value *= 1000
+        amounts.append(value)
+    if not amounts:
+        return None
+
+    lowered = text.lower()
+    period, per_year = None, 1
+    for name, count, pattern in PERIODS:
+        if pattern.search(lowered):
+            period, per_year = name, count
+            break
+    if period is None:
+        period, per_year = ("hourly", 2080) if max(amounts) < HOURLY_CEILING else ("annual", 1)
+
+    low, high = min(amounts[:2]), max(amounts[:2])
+    return low * per_year, high * per_year, period
+
+
+def job_salary(job):
+    # Detail pages carry salary_range; vacancy-table rows only salary_grade.
+    return parse_salary(job.get('salary_range', '')) or parse_salary(job.get('salary_grade', ''))
+
+
+def salary_arrays(jobs):
+    # Annual (min, max) for every job as float arrays, NaN where unknown.
+    mins = np.full(len(jobs), np.nan)
+    maxs = np.full(len(jobs), np.nan)
+    for i, job in enumerate(jobs):
+        parsed = job_salary(job)
+        if parsed:
+            mins[i], maxs[i] = parsed[0], parsed[1]
+    return mins, maxs
+
+
+def salary_gaps(mins, maxs, candidate_min, candidate_max):
+    # Signed annual gap between each job's range and the candidate's range:
+    # negative when the job tops out below the candidate, positive when it
+    # starts above, 0 when the ranges overlap, NaN when the job is unparsed.
+    below = maxs - candidate_min
+    above = mins - candidate_max
+    gaps = np.where(below < 0, below, np.where(above > 0, above, 0.0))
+    return np.where(np.isnan(mins) | np.isnan(maxs), np.nan, gaps)
+
+
+def relative_gaps(gaps, candidate_min, candidate_max):
+    midpoint = (candidate_min + candidate_max) / 2
+    return gaps / midpoint if midpoint > 0 else np.full_like(gaps, np.nan)
+
+
+def describe_gap(gap, relative):
+    if np.isnan(gap):
+        return ""
+    if gap == 0:
+        return "The job's salary range overlaps the candidate's current range."
+    direction = "below" if gap < 0 else "above"
+    return f"The job pays ${abs(gap):,.0f} ({abs(relative):.0%}) {direction} the candidate's current range (annualised)."
@@ -0,0 +1,184 @@
+import codecs
+import os
+
+import requests
+
+from statejobs.cache import cached_get
+from statejobs.deadlines import deadline_priority, is_expired, soonest_first
+from statejobs.fetch import DEFAULT_WORKERS, fetch_all, fetch_iter, make_session
+from statejobs.metrics import METRICS
+from statejobs.parse import default_backend, iter_vacancy_rows, parse_job_details, parse_vacancy_table
+from statejobs.sync import diff_vacancies, dropped_ids, needs_fetch, plan_detail_sync, row_hash
+
+VACANCY_URL = "https://statejobs.ny.gov/employees/vacancyTable.cfm?searchResults=Yes&Keywords=&title=&JurisClassID=&AgID=&isnyhelp=&minDate=&maxDate=&employmentType=&gradeCompareType=GT&grade=&SalMin="
+DETAIL_URL = "https://statejobs.ny.gov/employees/vacancyDetailsPrint.cfm?id={item_id}"
+
+# Override with STATEJOBS_PARSER=html.parser|lxml|selectolax; defaults to the fastest installed.
+PARSER_BACKEND = os.getenv("STATEJOBS_PARSER") or default_backend()
+TABLE_CHUNK_SIZE = 64 * 1024
+# Checkpoint records carry the row_hash of the vacancy row they were fetched
+# for, so a leftover detail is not reused once the row has changed.
+ROW_HASH_KEY = "_row_hash"
+
+
+def scrape_vacancy_table(url=VACANCY_URL, session=None, backend=None):
+    # Raises on network or HTTP errors; callers decide how to report them.
+    with METRICS.span("fetch_table") as span:
+        response = (session or requests).get(url, timeout=10)
+        span.count("bytes", len(response.content))
+    response.raise_for_status()
+    return parse_vacancy_table(response.text, backend=backend or PARSER_BACKEND)
+
+
+def stream_vacancy_table(url=VACANCY_URL, session=None, chunk_size=TABLE_CHUNK_SIZE):
+    # Generator version of scrape_vacancy_table: reads the response in chunks
+    # and yields each job as soon as its row has arrived, so memory stays
+    # flat and callers can act on early rows while the rest downloads.
+    # Raises on network or HTTP errors, possibly after some rows were yielded.
+    with METRICS.span("fetch_table") as span:
+        with (session or requests).get(url, timeout=10, stream=True) as response:
+            response.raise_for_status()
+            decoder = codecs.getincrementaldecoder(response.encoding or "utf-8")(errors="replace")
+
+            def chunks():
+                for data in response.iter_content(chunk_size):
+                    span.count("bytes", len(data))
+                    yield decoder.decode(data)
+                yield decoder.decode(b"", final=True)
+
+            yield from iter_vacancy_rows(chunks())
+
+
+def scrape_job_details(item_id, session=None, cache=None, backend=None, revalidate=False):
+    html = cached_get(DETAIL_URL.format(item_id=item_id), item_id, session=session, cache=cache, revalidate=revalidate)
+    return parse_job_details(html, item_id, backend=backend or PARSER_BACKEND)
+
+
+def sync_details(store, all_jobs, selected_jobs, cache=None, max_workers=DEFAULT_WORKERS,
+                 incremental=True, index=None, on_done=None, sink=None, skip_expired=True):
+    # Fetches details for selected_jobs, stores them and returns
+    # (details in selected_jobs order, freshly fetched details, diff). With
+    # incremental=True only new or changed postings are fetched and the rest
+    # are carried over from the store; diff is None for a full sync. index,
+    # if given, is an EmbeddingIndex that the fresh details are added to.
+    # sink, a JsonlSink, receives each detail as it is fetched; details it
+    # already holds from an interrupted run are not fetched again unless
+    # their vacancy row has changed since.
+    # skip_expired leaves out postings whose application deadline has passed;
+    # the rest are fetched soonest deadline first.
+    if skip_expired:
+        selected_jobs = [job for job in selected_jobs if not is_expired(job)]
+    if incremental:
+        diff, to_fetch, carried = plan_detail_sync(store.load_snapshot(), all_jobs, selected_jobs)
+    else:
+        diff = None
+        to_fetch = [job['item_number'] for job in selected_jobs]
+        carried = {}
+
+    jobs_by_id = {job['item_number']: job for job in selected_jobs}
+    checkpointed = {}
+    if sink is not None:
+        for item_id in to_fetch:
+            detail = _checkpointed(sink, jobs_by_id[item_id])
+            if detail is not None:
+                checkpointed[item_id] = detail
+        to_fetch = [item_id for item_id in to_fetch if item_id not in checkpointed]
+    to_fetch = soonest_first(to_fetch, job=jobs_by_id.get)
+
+    session = make_session(pool_size=max_workers)
+    with session:
+        fetched = fetch_all(
+            to_fetch, _detail_fetcher(session, cache, sink, jobs_by_id), max_workers=max_workers, on_done=on_done
+        )
+    details, fetched = _store_details(store, selected_jobs, fetched, checkpointed, carried, diff, index)
+    return details, fetched, diff
+
+
+def stream_sync_details(store, rows, counties=None, cache=None, max_workers=DEFAULT_WORKERS,
+                        incremental=True, index=None, on_done=None, sink=None, skip_expired=True):
+    # sync_details for a vacancy table that is still downloading: rows is an
+    # iterable of table rows (stream_vacancy_table). Every row in `counties`
+    # (all rows when empty) whose detail needs fetching is handed to the
+    # fetch pool as soon as it is parsed, overlapping the table download with
+    # the detail fetches; rows waiting for a worker go soonest deadline first.
+    # Returns (all_jobs, details, fetched, diff); the caller stores all_jobs
+    # with replace_vacancies once the table is complete.
+    snapshot = store.load_snapshot() if incremental else {"vacancies": [], "details": {}}
+    previous = {job['item_number']: job for job in snapshot["vacancies"]}
+    counties = set(counties or ())
+    all_jobs = []
+    selected_jobs = []
+    jobs_by_id = {}
+    checkpointed = {}
+    carried = {}
+
+    def to_fetch():
+        for job in rows:
+            all_jobs.append(job)
+            if counties and job['county'] not in counties:
+                continue
+            if skip_expired and is_expired(job):
+                continue
+            selected_jobs.append(job)
+            jobs_by_id[job['item_number']] = job
+            item_id = job['item_number']
+            if incremental and not needs_fetch(job, previous, snapshot["details"]):
+                carried[item_id] = snapshot["details"][item_id]
+                continue
+            detail = _checkpointed(sink, job) if sink is not None else None
+            if detail is not None:
+                checkpointed[item_id] = detail
+            else:
+                yield item_id
+
+    session = make_session(pool_size=max_workers)
+    with session:
+        fetched = fetch_iter(
+            to_fetch(), _detail_fetcher(session, cache, sink, jobs_by_id), max_workers=max_workers, on_done=on_done,
+            priority=lambda item_id: deadline_priority(jobs_by_id[item_id])
+        )
+    diff = diff_vacancies(snapshot["vacancies"], all_jobs) if incremental else None
+    details, fetched = _store_details(store, selected_jobs, fetched, checkpointed, carried, diff, index)
+    return all_jobs, details, fetched, diff
+
+
+def _checkpointed(sink, job):
+    # The detail an interrupted run checkpointed for this row, or None when
+    # there is none or it was fetched for an older version of the row.
+    record = sink.completed.get(job['item_number'])
+    if record is None or record.get(ROW_HASH_KEY) != row_hash(job):
+        return None
+    return {key: value for key, value in record.items() if key != ROW_HASH_KEY}
+
+
+def _detail_fetcher(session, cache, sink, jobs_by_id):
+    # Every id handed to the fetcher is new, changed or lacks a usable stored
+    # detail, so a cached copy is revalidated however young it is.
+    def fetch_one(item_id):
+        details = scrape_job_details(item_id, session=session, cache=cache, revalidate=True)
+        if sink is not None:
+            sink.write(dict(details, **{ROW_HASH_KEY: row_hash(jobs_by_id[item_id])}))
+        return details
+    return fetch_one
+
+
+def _store_details(store, selected_jobs, fetched, checkpointed, carried, diff, index):
+    # Shared tail of sync_details and stream_sync_details; diff is None for a
+    # full sync. Returns (details in selected_jobs order, fetched details).
+    fetched = dict(checkpointed, **fetched)
+
+    details = {}
+    for job in selected_jobs:
+        item_id = job['item_number']
+        if item_id in fetched:
+            details[item_id] = fetched[item_id]
+        elif item_id in carried:
+            details[item_id] = carried[item_id]
+
+    if diff is not None:
+        store.delete_details(dropped_ids(diff, fetched))
+    store.upsert_details(fetched, {job['item_number']: job for job in selected_jobs})
+    if index is not None:
+        # Embed new or changed postings now so matching can rank them instantly.
+        index.add(list(fetched.values()))
+    return details, fetched
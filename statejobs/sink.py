@@ -0,0 +1,157 @@
+import json
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: only sinks within this process exclude each other.
+    fcntl = None
+
+DEFAULT_CHECKPOINT_DIR = os.path.join(".cache", "runs")
+DEFAULT_FSYNC_EVERY = 25  # records
+DEFAULT_FSYNC_INTERVAL = 2.0  # seconds
+
+# Checkpoint files held open by a JsonlSink in this process.
+_open_paths = set()
+_open_paths_lock = threading.Lock()
+
+
+class CheckpointInUse(RuntimeError):
+    pass
+
+
+def checkpoint_path(name, directory=DEFAULT_CHECKPOINT_DIR):
+    return os.path.join(directory, f"{name}.jsonl")
+
+
+def read_jsonl(path):
+    # Yields the records of a JSONL file. A line that does not decode (the
+    # tail of a write cut short by a crash) is skipped.
+    if not os.path.exists(path):
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+
+def load_completed(path, key="item_number"):
+    # {key: last record} for the records of a partial run. Error records are
+    # left out so those items are retried.
+    return {
+        record[key]: record
+        for record in read_jsonl(path)
+        if key in record and 'error' not in record
+    }
+
+
+class JsonlSink:
+    # Append-only JSONL checkpoint: every record is written and flushed as
+    # soon as it is produced and fsynced every fsync_every records or
+    # fsync_interval seconds, so a crash loses at most the last few unsynced
+    # lines. completed holds what an earlier, interrupted run already wrote;
+    # callers skip those items and discard() the file once the run's results
+    # are safely in the job store. Safe to write from several threads.
+    # Only one sink at a time may hold a file: opening one that another run
+    # (a thread here, or another process where fcntl is available) still
+    # holds raises CheckpointInUse. With restart, records of an earlier run
+    # are dropped instead of resumed.
+
+    def __init__(self, path, key="item_number", fsync_every=DEFAULT_FSYNC_EVERY, fsync_interval=DEFAULT_FSYNC_INTERVAL,
+                 restart=False):
+        self.path = path
+        self.key = key
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._claim()
+        try:
+            self._file = open(path, "a", encoding="utf-8")
+            if fcntl is not None:
+                try:
+                    fcntl.flock(self._file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    self._file.close()
+                    raise CheckpointInUse(f"Checkpoint {path} is in use by another run") from None
+            if restart:
+                self._file.truncate(0)
+            self.completed = load_completed(path, key)
+            self._drop_torn_tail()
+        except BaseException:
+            self._release()
+            raise
+        self._unsynced = 0
+        self._synced_at = time.monotonic()
+
+    def _claim(self):
+        with _open_paths_lock:
+            if os.path.abspath(self.path) in _open_paths:
+                raise CheckpointInUse(f"Checkpoint {self.path} is in use by another run")
+            _open_paths.add(os.path.abspath(self.path))
+
+    def _release(self):
+        with _open_paths_lock:
+            _open_paths.discard(os.path.abspath(self.path))
+
+    def _drop_torn_tail(self):
+        # Cut a partial last line so new records start on a line of their own.
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb+") as f:
+            data = f.read()
+            if data and not data.endswith(b"\n"):
+                f.truncate(data.rfind(b"\n") + 1)
+
+    def write(self, record):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            self._unsynced += 1
+            if self._unsynced >= self.fsync_every or time.monotonic() - self._synced_at >= self.fsync_interval:
+                self._sync()
+
+    def _sync(self):
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._synced_at = time.monotonic()
+
+    def close(self):
+        with self._lock:
+            if self._file.closed:
+                return
+            self._file.flush()
+            self._sync()
+            self._file.close()
+        self._release()
+
+    def discard(self):
+        # The run finished and its results were stored elsewhere. Where the
+        # file is locked it is removed before closing, so no other run can
+        # open it in between.
+        with self._lock:
+            if self._file.closed:
+                # Closed already: the file may belong to another run by now.
+                return
+            if fcntl is not None and os.path.exists(self.path):
+                os.remove(self.path)
+            self._file.close()
+            if fcntl is None and os.path.exists(self.path):
+                # Windows cannot remove a file that is still open.
+                os.remove(self.path)
+        self._release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,197 @@
+import json
+import sqlite3
+import threading
+import time
+
+DEFAULT_DB_PATH = "statejobs.sqlite3"
+VACANCY_FIELDS = ("item_number", "job_title", "salary_grade", "posting_date", "application_deadline", "agency", "county")
+MATCH_FIELDS = ("item_number", "job_title", "resume_match_level", "match_explanation")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS vacancies (
+    item_number TEXT PRIMARY KEY,
+    job_title TEXT,
+    salary_grade TEXT,
+    posting_date TEXT,
+    application_deadline TEXT,
+    agency TEXT,
+    county TEXT,
+    scraped_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_vacancies_county ON vacancies(county);
+CREATE INDEX IF NOT EXISTS idx_vacancies_agency ON vacancies(agency);
+CREATE INDEX IF NOT EXISTS idx_vacancies_deadline ON vacancies(application_deadline);
+
+-- synced_* hold the vacancy-table dates the detail page was fetched against,
+-- which is what incremental sync diffs the next table scrape with.
+CREATE TABLE IF NOT EXISTS details (
+    item_number TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    has_error INTEGER NOT NULL DEFAULT 0,
+    synced_posting_date TEXT,
+    synced_deadline TEXT,
+    scraped_at REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS matches (
+    resume_id TEXT NOT NULL,
+    item_number TEXT NOT NULL,
+    job_title TEXT,
+    resume_match_level TEXT,
+    match_explanation TEXT,
+    matched_at REAL NOT NULL,
+    PRIMARY KEY (resume_id, item_number)
+);
+CREATE INDEX IF NOT EXISTS idx_matches_item_number ON matches(item_number);
+CREATE INDEX IF NOT EXISTS idx_matches_matched_at ON matches(matched_at);
+"""
+
+
+class JobStore:
+    # Local SQLite store for scraped vacancies, detail pages and match results
+    # so every page (and every new Streamlit session) can start from the last
+    # scrape instead of from nothing.
+
+    def __init__(self, path=DEFAULT_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.executescript(SCHEMA)
+
+    # Vacancies
+
+    def replace_vacancies(self, jobs):
+        # The vacancy table is always scraped in full, so rows that are no
+        # longer listed are dropped and everything else is upserted.
+        now = time.time()
+        rows = [tuple(job.get(field, "") for field in VACANCY_FIELDS) + (now,) for job in jobs]
+        with self._lock, self._conn:
+            self._conn.execute("CREATE TEMP TABLE IF NOT EXISTS current_ids (item_number TEXT PRIMARY KEY)")
+            self._conn.execute("DELETE FROM current_ids")
+            self._conn.executemany("INSERT OR IGNORE INTO current_ids VALUES (?)", [(row[0],) for row in rows])
+            self._conn.execute("DELETE FROM vacancies WHERE item_number NOT IN (SELECT item_number FROM current_ids)")
+            self._conn.executemany(
+                f"INSERT INTO vacancies ({', '.join(VACANCY_FIELDS)}, scraped_at) "
+                f"VALUES ({', '.join('?' * (len(VACANCY_FIELDS) + 1))}) "
+                "ON CONFLICT(item_number) DO UPDATE SET "
+                + ", ".join(f"{field} = excluded.{field}" for field in VACANCY_FIELDS[1:])
+                + ", scraped_at = excluded.scraped_at",
+                rows
+            )
+
+    def load_vacancies(self, counties=None, agencies=None):
+        clauses = []
+        params = []
+        if counties:
+            clauses.append(f"county IN ({', '.join('?' * len(counties))})")
+            params.extend(counties)
+        if agencies:
+            clauses.append(f"agency IN ({', '.join('?' * len(agencies))})")
+            params.extend(agencies)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(VACANCY_FIELDS)} FROM vacancies{where} ORDER BY rowid",
+                params
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def counties(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT DISTINCT county FROM vacancies ORDER BY county").fetchall()
+        return [row[0] for row in rows]
+
+    # Details
+
+    def upsert_details(self, details, vacancies_by_id=None):
+        now = time.time()
+        vacancies_by_id = vacancies_by_id or {}
+        rows = []
+        for item_id, detail in details.items():
+            vacancy = vacancies_by_id.get(item_id, {})
+            rows.append((
+                item_id,
+                json.dumps(detail, ensure_ascii=False),
+                1 if 'error' in detail else 0,
+                vacancy.get("posting_date"),
+                vacancy.get("application_deadline"),
+                now
+            ))
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO details "
+                "(item_number, data, has_error, synced_posting_date, synced_deadline, scraped_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows
+            )
+
+    def delete_details(self, item_numbers):
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM details WHERE item_number = ?", [(i,) for i in item_numbers])
+
+    def load_details(self, item_numbers=None):
+        with self._lock:
+            if item_numbers is None:
+                # Only details for postings that are still listed.
+                rows = self._conn.execute(
+                    "SELECT d.item_number, d.data FROM details d "
+                    "JOIN vacancies v ON v.item_number = d.item_number ORDER BY v.rowid"
+                ).fetchall()
+            else:
+                item_numbers = list(item_numbers)
+                rows = []
+                for start in range(0, len(item_numbers), 500):
+                    chunk = item_numbers[start:start + 500]
+                    rows.extend(self._conn.execute(
+                        f"SELECT item_number, data FROM details WHERE item_number IN ({', '.join('?' * len(chunk))})",
+                        chunk
+                    ).fetchall())
+        return {row[0]: json.loads(row[1]) for row in rows}
+
+    def load_snapshot(self):
+        # Shape expected by statejobs.sync.plan_detail_sync.
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT item_number, data, synced_posting_date, synced_deadline FROM details"
+            ).fetchall()
+        return {
+            "vacancies": [
+                {"item_number": row[0], "posting_date": row[2], "application_deadline": row[3]}
+                for row in rows
+            ],
+            "details": {row[0]: json.loads(row[1]) for row in rows}
+        }
+
+    # Match results
+
+    def upsert_matches(self, results, resume_id):
+        now = time.time()
+        rows = [(resume_id,) + tuple(r.get(field, "") for field in MATCH_FIELDS) + (now,) for r in results]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO matches "
+                f"(resume_id, {', '.join(MATCH_FIELDS)}, matched_at) VALUES (?, ?, ?, ?, ?, ?)",
+                rows
+            )
+
+    def load_matches(self, resume_id=None):
+        # Defaults to the most recently matched resume.
+        with self._lock:
+            if resume_id is None:
+                latest = self._conn.execute(
+                    "SELECT resume_id FROM matches ORDER BY matched_at DESC LIMIT 1"
+                ).fetchone()
+                if latest is None:
+                    return []
+                resume_id = latest[0]
+            rows = self._conn.execute(
+                f"SELECT {', '.join(MATCH_FIELDS)} FROM matches WHERE resume_id = ? ORDER BY rowid",
+                (resume_id,)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,67 @@
+import hashlib
+
+# A posting is considered changed when any of these differ from the snapshot.
+SYNC_FIELDS = ("posting_date", "application_deadline")
+
+
+def row_hash(job):
+    # Fingerprint of a vacancy row's SYNC_FIELDS: a detail fetched for one
+    # version of the row is stale for any other.
+    values = "\x1f".join(str(job.get(field) or "") for field in SYNC_FIELDS)
+    return hashlib.sha256(values.encode("utf-8")).hexdigest()[:16]
+
+
+def diff_vacancies(previous, current):
+    previous_by_id = {job['item_number']: job for job in previous}
+    current_ids = set()
+    diff = {"new": [], "changed": [], "unchanged": [], "removed": []}
+    for job in current:
+        item_id = job['item_number']
+        current_ids.add(item_id)
+        old = previous_by_id.get(item_id)
+        if old is None:
+            diff["new"].append(job)
+        elif any(old.get(field) != job.get(field) for field in SYNC_FIELDS):
+            diff["changed"].append(job)
+        else:
+            diff["unchanged"].append(job)
+    diff["removed"] = [job for item_id, job in previous_by_id.items() if item_id not in current_ids]
+    return diff
+
+
+def plan_detail_sync(snapshot, all_jobs, selected_jobs):
+    # Decides which of selected_jobs need a fresh detail fetch. snapshot is
+    # {"vacancies": [...], "details": {...}} as returned by
+    # JobStore.load_snapshot(). Unchanged rows reuse the stored details unless
+    # the stored entry is missing or an error.
+    diff = diff_vacancies(snapshot["vacancies"], all_jobs)
+    previous = {job['item_number']: job for job in snapshot["vacancies"]}
+    stored = snapshot["details"]
+    to_fetch = []
+    carried = {}
+    for job in selected_jobs:
+        item_id = job['item_number']
+        if needs_fetch(job, previous, stored):
+            to_fetch.append(item_id)
+        else:
+            carried[item_id] = stored[item_id]
+    return diff, to_fetch, carried
+
+
+def needs_fetch(job, previous, stored):
+    # One row's share of plan_detail_sync, usable before the rest of the
+    # table is known: new or changed since the snapshot (previous maps
+    # item_number -> snapshot row), or no usable stored detail.
+    old = previous.get(job['item_number'])
+    if old is None or any(old.get(field) != job.get(field) for field in SYNC_FIELDS):
+        return True
+    detail = stored.get(job['item_number'])
+    return detail is None or 'error' in detail
+
+
+def dropped_ids(diff, fresh_details):
+    # Stored details that must not be carried over next time: postings that
+    # left the table, or that are new/changed but were not refetched (e.g.
+    # outside the current county filter).
+    stale = {job['item_number'] for job in diff["removed"] + diff["new"] + diff["changed"]}
+    return stale - set(fresh_details)
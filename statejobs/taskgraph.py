@@ -0,0 +1,99 @@
+import asyncio
+import contextlib
+import heapq
+import itertools
+
+DEFAULT_CONCURRENCY = 8
+
+
+class PrioritySemaphore:
+    # asyncio.Semaphore whose waiters are woken lowest priority first (a
+    # heap) instead of in arrival order; equal priorities stay FIFO. Used
+    # as `async with semaphore.slot(priority):`.
+
+    def __init__(self, value):
+        self._free = max(1, int(value))
+        self._waiters = []
+        self._order = itertools.count()
+
+    async def acquire(self, priority=0):
+        if self._free and not self._waiters:
+            self._free -= 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._order), future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was handed over just before the cancel; pass it on.
+                self.release()
+            raise
+
+    def release(self):
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+        self._free += 1
+
+    @contextlib.asynccontextmanager
+    async def slot(self, priority=0):
+        await self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+
+def topological_order(tasks):
+    # tasks maps key -> (coroutine function, dependency keys). Raises
+    # ValueError for unknown dependencies and cycles.
+    for key, (_, deps) in tasks.items():
+        for dep in deps:
+            if dep not in tasks:
+                raise ValueError(f"Task {key!r} depends on unknown task {dep!r}")
+    remaining = {key: set(deps) for key, (_, deps) in tasks.items()}
+    order = []
+    while remaining:
+        ready = [key for key, deps in remaining.items() if not deps]
+        if not ready:
+            raise ValueError(f"Dependency cycle among tasks: {sorted(map(str, remaining))}")
+        for key in ready:
+            order.append(key)
+            del remaining[key]
+        for deps in remaining.values():
+            deps.difference_update(ready)
+    return order
+
+
+async def run_graph(tasks, concurrency=DEFAULT_CONCURRENCY, on_done=None, priority=None):
+    # Runs every task as soon as its dependencies have finished, with at most
+    # `concurrency` tasks running at once across the whole graph. Each task is
+    # awaited as func(*dependency_results). on_done(key, result_or_exception)
+    # is called as each task settles. A failed task fails its dependents
+    # without running them. When more tasks are ready than there are slots,
+    # the lowest priority(key) runs first. Returns {key: result or exception}.
+    order = topological_order(tasks)
+    semaphore = PrioritySemaphore(concurrency)
+    futures = {}
+
+    async def run(key):
+        func, deps = tasks[key]
+        try:
+            inputs = [await futures[dep] for dep in deps]
+            async with semaphore.slot(priority(key) if priority else 0):
+                result = await func(*inputs)
+        except Exception as e:
+            if on_done:
+                on_done(key, e)
+            raise
+        if on_done:
+            on_done(key, result)
+        return result
+
+    for key in order:
+        futures[key] = asyncio.ensure_future(run(key))
+    settled = await asyncio.gather(*futures.values(), return_exceptions=True)
+    return dict(zip(futures, settled))
@@ -0,0 +1,167 @@
+import itertools
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_WORKERS = 2
+# Finished tasks are kept this long so a page that polls late still sees them.
+DEFAULT_RETENTION = 24 * 60 * 60
+
+
+class Cancelled(Exception):
+    pass
+
+
+class Task:
+    # Handle passed to a task function: report progress, check cancellation.
+
+    def __init__(self, task_id, kind, owner, label, key=None):
+        self.id = task_id
+        self.kind = kind
+        self.owner = owner
+        self.label = label
+        self.key = key
+        self.state = "queued"
+        self.done = 0
+        self.total = 0
+        self.message = ""
+        self.result = None
+        self.error = None
+        self.traceback = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.cancel_requested = False
+
+    def progress(self, done, total, message=None):
+        # Raises Cancelled once cancel() was called, so a task stops at its
+        # next progress report; per-item checkpoints keep what it finished.
+        self.done = done
+        self.total = total
+        if message is not None:
+            self.message = message
+        if self.cancel_requested:
+            raise Cancelled()
+
+    def snapshot(self):
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "owner": self.owner,
+            "label": self.label,
+            "key": self.key,
+            "state": self.state,
+            "done": self.done,
+            "total": self.total,
+            "message": self.message,
+            "error": self.error,
+            "traceback": self.traceback,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at
+        }
+
+
+class JobRunner:
+    # Background thread pool for the long runs (detail scraping, matching) so
+    # they survive Streamlit reruns, widget clicks and closed tabs. One
+    # runner is shared by every session (st.cache_resource); tasks are tagged
+    # with the submitting session as owner and keep their own status and
+    # result, never touching anyone's session_state. Results also land in the
+    # job store, and the task functions checkpoint each item to a JSONL sink,
+    # so a task that is cancelled or lost with the process resumes where it
+    # stopped when it is submitted again.
+
+    def __init__(self, max_workers=DEFAULT_WORKERS, retention=DEFAULT_RETENTION):
+        self.retention = retention
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="statejobs-worker")
+        self._tasks = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def submit(self, kind, func, owner=None, label="", key=None):
+        # func(task) runs on a worker thread; its return value becomes the
+        # task's result. Returns the task id. While a task submitted with the
+        # same key (e.g. its checkpoint name) is queued or running, its id is
+        # returned instead of starting a second run on the same files.
+        with self._lock:
+            self._prune()
+            if key is not None:
+                for task in self._tasks.values():
+                    if task.key == key and task.state in ("queued", "running"):
+                        return task.id
+            task = Task(f"{kind}-{next(self._ids)}", kind, owner, label, key)
+            self._tasks[task.id] = task
+        self._pool.submit(self._run, task, func)
+        return task.id
+
+    def _run(self, task, func):
+        if task.cancel_requested:
+            task.state = "cancelled"
+            task.finished_at = time.time()
+            return
+        task.state = "running"
+        task.started_at = time.time()
+        try:
+            task.result = func(task)
+            task.state = "done"
+        except Cancelled:
+            task.state = "cancelled"
+        except Exception as e:
+            task.error = str(e) or type(e).__name__
+            task.traceback = traceback.format_exc()
+            task.state = "failed"
+        task.finished_at = time.time()
+
+    def _prune(self):
+        cutoff = time.time() - self.retention
+        for task_id in [t.id for t in self._tasks.values() if t.finished_at and t.finished_at < cutoff]:
+            del self._tasks[task_id]
+
+    def status(self, task_id):
+        with self._lock:
+            task = self._tasks.get(task_id)
+            return task.snapshot() if task else None
+
+    def result(self, task_id):
+        with self._lock:
+            task = self._tasks.get(task_id)
+            return task.result if task else None
+
+    def tasks(self, kind=None, owner=None):
+        # Snapshots, newest first.
+        with self._lock:
+            tasks = list(self._tasks.values())
+        return [
+            task.snapshot()
+            for task in sorted(tasks, key=lambda t: t.submitted_at, reverse=True)
+            if (kind is None or task.kind == kind) and (owner is None or task.owner == owner)
+        ]
+
+    def active(self, kind=None, owner=None):
+        return [t for t in self.tasks(kind, owner) if t["state"] in ("queued", "running")]
+
+    def cancel(self, task_id):
+        with self._lock:
+            task = self._tasks.get(task_id)
+            if task:
+                task.cancel_requested = True
+
+    def shutdown(self, wait=True):
+        self._pool.shutdown(wait=wait)
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def shared_runner():
+    # One runner per process, so every page and session sees the same tasks
+    # (st.cache_resource is keyed per page script, which would give each page
+    # its own pool).
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = JobRunner()
+        return _shared
@@ -0,0 +1,145 @@
+# Minimal OpenAI-compatible chat completions server for exercising the app
+# offline:
+#
+#   python tools/mock_openai_server.py --port 8765 --latency 0.5 --fail-rate 0.1
+#   OPENAI_BASE_URL=http://127.0.0.1:8765/v1 OPENAI_API_KEY=test streamlit run state_jobs_get_jobs2.py
+#
+# Responses are canned but shaped like the real prompts expect (match JSON,
+# batch JSON arrays, domain/salary JSON, plain text). --fail-rate makes a
+# share of requests answer 429 or 500 to exercise retries. Requests with
+# "stream": true get server-sent events, one word per chunk every
+# --chunk-delay seconds; --doc-words pads plain-text replies so streamed
+# documents take a while, like real cover letters do.
+import argparse
+import json
+import random
+import re
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def canned_reply(prompt, doc_words=0):
+    if "JSON array" in prompt:
+        ids = re.findall(r"^Item Number: (.+)$", prompt, flags=re.MULTILINE)
+        return json.dumps([
+            {"item_number": item_id, "resume_match_level": "minimum", "match_explanation": "Mock batch evaluation."}
+            for item_id in ids
+        ])
+    if "resume_match_level" in prompt:
+        return json.dumps({"resume_match_level": "minimum", "match_explanation": "Mock evaluation."})
+    if "candidate_domain" in prompt:
+        return json.dumps({"candidate_domain": "Data Engineering", "candidate_salary_range": "$70,000-$90,000"})
+    text = "Mock document text."
+    if doc_words > 3:
+        text += " " + " ".join(f"word{i}" for i in range(doc_words - 3))
+    return text
+
+
+class Handler(BaseHTTPRequestHandler):
+    latency = 0.0
+    fail_rate = 0.0
+    chunk_delay = 0.0
+    doc_words = 0
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if not self.path.endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": f"unknown path {self.path}"}})
+            return
+
+        time.sleep(self.latency)
+        if random.random() < self.fail_rate:
+            status = random.choice([429, 500])
+            self._send_json(status, {"error": {"message": "mock failure", "type": "mock"}}, {"Retry-After": "0.1"})
+            return
+
+        prompt = "".join(m.get("content", "") for m in request.get("messages", []))
+        reply = canned_reply(prompt, self.doc_words)
+        prompt_tokens = len(prompt) // 4 + 1
+        completion_tokens = len(reply) // 4 + 1
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "prompt_tokens_details": {"cached_tokens": 0}
+        }
+        if request.get("stream"):
+            include_usage = (request.get("stream_options") or {}).get("include_usage")
+            self._send_stream(request, reply, usage if include_usage else None)
+            return
+        self._send_json(200, {
+            "id": f"chatcmpl-mock-{random.randrange(1 << 30)}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "mock"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": reply},
+                "finish_reason": "stop"
+            }],
+            "usage": usage
+        })
+
+    def _send_stream(self, request, reply, usage):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        base = {
+            "id": f"chatcmpl-mock-{random.randrange(1 << 30)}",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": request.get("model", "mock")
+        }
+
+        def send(chunk):
+            self.wfile.write(f"data: {json.dumps(dict(base, **chunk))}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        words = re.findall(r"\S+\s*", reply)
+        send({"choices": [{"index": 0, "delta": {"role": "assistant", "content": ""}, "finish_reason": None}]})
+        for word in words:
+            time.sleep(self.chunk_delay)
+            send({"choices": [{"index": 0, "delta": {"content": word}, "finish_reason": None}]})
+        send({"choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+        if usage:
+            send({"choices": [], "usage": usage})
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock OpenAI-compatible chat completions server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds to wait before answering")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="share of requests answered with 429/500")
+    parser.add_argument("--chunk-delay", type=float, default=0.02, help="seconds between streamed chunks")
+    parser.add_argument("--doc-words", type=int, default=0, help="pad plain-text replies to this many words")
+    args = parser.parse_args()
+
+    Handler.latency = args.latency
+    Handler.fail_rate = args.fail_rate
+    Handler.chunk_delay = args.chunk_delay
+    Handler.doc_words = args.doc_words
+    server = ThreadingHTTPServer((args.host, args.port), Handler)
+    print(f"Mock OpenAI server on http://{args.host}:{args.port}/v1")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()